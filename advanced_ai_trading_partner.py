@@ -3,721 +3,1154 @@ Advanced AI Trading Partner
 Enhanced AI system with advanced trading strategies, portfolio optimization, and market prediction
 """
 
+import copy
+import heapq
 import json
+import os
 import random
+import re
+import sys
+import time
 import numpy as np
+from collections import defaultdict, deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
-import yfinance as yf
-import pandas as pd
+from functools import lru_cache, wraps
+from itertools import islice
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional; fall back to plain NumPy/Python execution
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+# Question routing table, in priority order. Each route maps a question
+# category to its trigger keywords, the advice builder that answers it and the
+# names of the arguments that builder takes.
+_QUESTION_ROUTES = (
+    ('strategy', ('strategy', 'approach', 'method'),
+     '_provide_strategy_advice', ('strategy', 'market_data', 'portfolio_data')),
+    ('optimization', ('optimize', 'rebalance', 'allocation'),
+     '_provide_portfolio_optimization', ('portfolio_data', 'market_data')),
+    ('prediction', ('predict', 'forecast', 'future', 'outlook'),
+     '_provide_market_prediction', ('ticker', 'market_data')),
+    ('hedging', ('hedge', 'protect', 'risk management'),
+     '_provide_hedging_strategies', ('portfolio_data', 'market_data')),
+    ('sector', ('sector', 'rotation', 'theme'),
+     '_provide_sector_analysis', ('market_data',)),
+    ('options', ('options', 'derivatives', 'leverage'),
+     '_provide_options_strategies', ('ticker', 'market_data')),
+    ('crypto', ('crypto', 'bitcoin', 'ethereum'),
+     '_provide_crypto_analysis', ('ticker', 'market_data')),
+    ('dca', ('dca', 'dollar cost', 'averaging'),
+     '_provide_dca_strategy', ('ticker', 'amount', 'market_data')),
+    ('trading_style', ('swing', 'day', 'scalp'),
+     '_provide_trading_style_advice', ('question_lower', 'market_data')),
+    ('correlation', ('correlation', 'diversification'),
+     '_provide_correlation_analysis', ('portfolio_data', 'market_data')),
+    ('volatility', ('volatility', 'vix', 'vol'),
+     '_provide_volatility_analysis', ('market_data',)),
+    ('fundamental', ('earnings', 'fundamentals', 'valuation'),
+     '_provide_fundamental_analysis', ('ticker', 'market_data')),
+    ('technical', ('technical', 'chart', 'pattern'),
+     '_provide_technical_analysis', ('ticker', 'market_data')),
+    ('position_sizing', ('how much', 'amount', 'size', 'position'),
+     '_provide_advanced_position_sizing', ('ticker', 'amount', 'market_data', 'portfolio_data')),
+    ('timing', ('when', 'timing', 'entry', 'buy now'),
+     '_provide_advanced_timing_advice', ('ticker', 'market_data')),
+    ('risk', ('risk', 'safe', 'dangerous'),
+     '_provide_advanced_risk_assessment', ('ticker', 'market_data')),
+    ('explanation', ('why', 'reason', 'analysis'),
+     '_provide_advanced_analysis_explanation', ('ticker', 'market_data')),
+    ('portfolio', ('portfolio', 'diversification', 'allocation'),
+     '_provide_advanced_portfolio_advice', ('portfolio_data', 'market_data')),
+    ('recommendations', ('best', 'top', 'recommend'),
+     '_provide_advanced_recommendations', ('market_data',)),
+)
+
+_QUESTION_ROUTE_PRIORITY = {route[0]: rank for rank, route in enumerate(_QUESTION_ROUTES)}
+
+# One named group per route, wrapped in a lookahead so a single scan reports
+# every keyword occurrence (including overlapping ones) in the question.
+_QUESTION_ROUTE_RE = re.compile('(?=%s)' % '|'.join(
+    '(?P<%s>%s)' % (name, '|'.join(re.escape(word) for word in keywords))
+    for name, keywords, _, _ in _QUESTION_ROUTES
+))
+
+
+def _match_question_route(question_lower: str) -> Optional[str]:
+    """Return the highest-priority route whose keywords appear in the question"""
+    best_rank = None
+    for match in _QUESTION_ROUTE_RE.finditer(question_lower):
+        rank = _QUESTION_ROUTE_PRIORITY[match.lastgroup]
+        if best_rank is None or rank < best_rank:
+            best_rank = rank
+            if rank == 0:
+                break
+    return _QUESTION_ROUTES[best_rank][0] if best_rank is not None else None
+
+
+@njit(cache=True)
+def _hhi(values):
+    """Herfindahl concentration of position values"""
+    total = 0.0
+    squares = 0.0
+    for i in range(values.size):
+        total += values[i]
+        squares += values[i] * values[i]
+    return squares / (total * total) if total > 0 else 0.0
+
+
+@njit(cache=True)
+def _weight_stats(weights):
+    """Effective number of holdings and largest weight, in one pass"""
+    squares = 0.0
+    largest = weights[0] if weights.size else 0.0
+    for i in range(weights.size):
+        squares += weights[i] * weights[i]
+        if weights[i] > largest:
+            largest = weights[i]
+    return (1.0 / squares if squares > 0 else 0.0), largest
+
+
+@lru_cache(maxsize=512)
+def _sector_has(sector: str, keyword: str) -> bool:
+    """Whether a sector name contains a lowercase keyword, memoized per distinct sector"""
+    return keyword in sector.lower()
+
+
+def _market_memo(ttl: int = 30):
+    """Memoize a market_data-only analyzer per partner for up to ttl seconds"""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, market_data: Dict):
+            fields = market_data or {}
+            key = (method.__name__, int(time.time() // ttl),
+                   fields.get('timestamp'), fields.get('vix'), fields.get('spx'))
+            cache = self._market_cache
+            if key not in cache:
+                if len(cache) >= 64:
+                    cache.clear()
+                cache[key] = method(self, market_data)
+            return cache[key]
+        return wrapper
+    return decorator
+
+
+# Ticker mentions in an uppercased question, found in one leftmost scan;
+# at a given position a $-prefixed or -USD ticker beats the bare word
+_TICKER_RE = re.compile(r'\$([A-Z]{1,5})\b|([A-Z]{1,5}-USD)\b|\b([A-Z]{1,5})\b')
+
+# Amount extractors, tried in order; the first pattern that matches wins
+_AMOUNT_RES = (
+    re.compile(r'\$(\d+(?:,\d{3})*(?:\.\d{2})?)'),
+    re.compile(r'(\d+(?:,\d{3})*(?:\.\d{2})?)\s*dollars?'),
+    re.compile(r'(\d+(?:,\d{3})*(?:\.\d{2})?)\s*k'),
+    re.compile(r'(\d+(?:,\d{3})*(?:\.\d{2})?)\s*thousand')
+)
+
+
+# Timeframe keywords for _extract_timeframe, matched against whole words
+_WORD_RE = re.compile(r'[a-z]+')
+_SHORT_TERM = frozenset({'short', 'quick', 'quickly', 'immediate', 'immediately', 'soon', 'day', 'days'})
+_LONG_TERM = frozenset({'long', 'year', 'years', 'retirement', 'position', 'positions'})
+
+
+# Pre-built line templates for the list sections of the advice builders
+_SECTOR_REDUCE_LINE = "  - Reduce {} exposure (currently {:.1%})\\n".format
+_SECTOR_REC_LINE = "• **{}:** {}\\n".format
+_PAIR_LINE = "  - {} & {}: {:.2f}\\n".format
+_WEIGHT_LINE = "  - {}: {:.1%}\\n".format
+_OPP_TEMPLATE = (
+    "**#{i}. {ticker} - {name}**\\n"
+    "💰 **Profit Target:** +{profit_target:.0%} ({entry_price:.2f} → {target_price:.2f})\\n"
+    "📊 **Probability:** {probability:.0%} | **Risk:** {risk_level:.0%}\\n"
+    "🎯 **Entry:** ${entry_price:.2f} | **Stop:** ${stop_loss:.2f} | **Size:** {position_size:.0%}\\n"
+    "⏰ **Timeline:** {timeline}\\n\\n"
+).format
+
+
+@njit(cache=True, fastmath=True)
+def _kelly_and_sizing(win_rate, avg_win, avg_loss, volatility, n_positions):
+    """Kelly, risk-parity and inverse-volatility position sizes as portfolio fractions.
+    
+    Returns (kelly, half_kelly, aggressive_kelly, risk_parity, vol_adjusted, final).
+    """
+    kelly = (win_rate * avg_win - (1 - win_rate) * avg_loss) / avg_win
+    kelly = max(0.0, min(kelly, 0.25))  # Cap at 25%
+    risk_parity = 0.1 / n_positions if n_positions > 0 else 0.1
+    vol_adjusted = 0.1 / volatility  # Inverse volatility weighting
+    final = min(kelly * 0.5, vol_adjusted, 0.1)  # Conservative approach
+    return kelly, kelly * 0.5, kelly * 1.5, risk_parity, vol_adjusted, final
+
+
+# Score-bucketed outlooks, indexed by how many thresholds the score clears
+_PRICE_PREDICTIONS = (
+    "**Bearish:** Weak fundamentals suggest downward pressure. Target: -10-20% over 6 months.\\n",
+    "**Neutral:** Mixed signals suggest sideways movement. Target: -5% to +5% over 6 months.\\n",
+    "**Moderately Bullish:** Positive trends suggest modest gains. Target: +5-15% over 6 months.\\n",
+    "**Bullish Outlook:** Strong fundamentals and momentum suggest upward price movement. Target: +15-25% over 6 months.\\n"
+)
+_OPTIONS_STRATEGIES = (
+    "**Bearish Strategies:**\\n• Long puts for downside protection\\n• Put spreads for limited risk\\n• Short calls for income\\n",
+    "**Neutral Strategies:**\\n• Iron condors for range-bound markets\\n• Straddles for volatility plays\\n• Calendar spreads for time decay\\n",
+    "**Bullish Strategies:**\\n• Long calls for upside leverage\\n• Covered calls for income\\n• Bull call spreads for limited risk\\n"
+)
+
+# Entry/exit/risk notes per strategy, shown under the strategy overview
+_STRATEGY_DETAILS: Mapping[str, str] = MappingProxyType({
+    'momentum': "• **Entry:** Breakout above resistance with volume\\n• **Exit:** Momentum divergence or support break\\n• **Risk Management:** Trail stop-loss\\n",
+    'value': "• **Entry:** Undervalued based on fundamentals\\n• **Exit:** Price reaches fair value\\n• **Risk Management:** Wide stop-loss for volatility\\n",
+    'growth': "• **Entry:** Strong growth metrics and momentum\\n• **Exit:** Growth slows or valuation excessive\\n• **Risk Management:** Monitor growth sustainability\\n",
+    'dividend': "• **Entry:** High dividend yield with growth\\n• **Exit:** Dividend cut or yield too low\\n• **Risk Management:** Focus on dividend sustainability\\n",
+    'contrarian': "• **Entry:** Extreme sentiment readings\\n• **Exit:** Sentiment normalizes\\n• **Risk Management:** Position sizing critical\\n",
+    'arbitrage': "• **Entry:** Price discrepancies identified\\n• **Exit:** Prices converge\\n• **Risk Management:** Monitor correlation breakdown\\n"
+})
+
+# Openers for questions that match no route, one picked at random
+_GENERAL_ADVICE_RESPONSES = (
+    "I'm your advanced AI trading partner! I can help with:\n\n• Advanced position sizing (Kelly Criterion, Risk Parity)\n• Multi-timeframe analysis\n• Options strategies\n• Portfolio optimization\n• Risk management\n• Market predictions\n• Sector rotation\n• Volatility analysis\n\nWhat would you like to know?",
+    "I specialize in advanced trading strategies and portfolio optimization. Ask me about:\n\n• Momentum vs Value strategies\n• Options trading strategies\n• Cryptocurrency analysis\n• Hedging techniques\n• Correlation analysis\n• Volatility trading\n• Fundamental analysis\n• Technical analysis\n\nWhat's your question?",
+    "I can provide institutional-quality analysis and strategies. Try asking:\n\n• 'What's the best strategy for this market?'\n• 'How should I optimize my portfolio?'\n• 'What are the top opportunities right now?'\n• 'How do I hedge my positions?'\n• 'What's the risk level of [stock]?'\n\nWhat would you like to explore?"
+)
+
+# Fixed sector calls and the correlation summary shown without price history
+_SECTOR_RECOMMENDATIONS: Mapping[str, str] = MappingProxyType({
+    'Technology': 'Moderate allocation - focus on AI leaders',
+    'Healthcare': 'Overweight - demographic trends supportive',
+    'Financials': 'Underweight - interest rate sensitivity',
+    'Energy': 'Neutral - volatile commodity prices',
+    'Consumer Staples': 'Overweight - defensive positioning'
+})
+_FALLBACK_CORRELATIONS: Mapping[str, object] = MappingProxyType({
+    'average': 0.65,
+    'highest': 'AAPL & MSFT: 0.85',
+    'lowest': 'Bonds & Stocks: -0.15',
+    'high_correlation_pairs': (('AAPL', 'MSFT', 0.85), ('GOOGL', 'META', 0.78))
+})
+
+# Static reference sections of the advice builders, assembled once at import
+_VIX_BLOCK = (
+    "**VIX (Fear Index) Analysis:**\\n"
+    "• **VIX < 20:** Low volatility, complacent market\\n"
+    "• **VIX 20-30:** Normal volatility range\\n"
+    "• **VIX > 30:** High volatility, fear in market\\n"
+    "• **VIX > 40:** Extreme fear, potential buying opportunity\\n\\n"
+)
+
+_VOL_STRATEGIES_BLOCK = (
+    "**Volatility Trading Strategies:**\\n\\n"
+    "**1. High Volatility Environment:**\\n"
+    "• **Strategy:** Reduce position sizes, increase cash\\n"
+    "• **Hedging:** Buy protective puts\\n"
+    "• **Opportunities:** Volatility selling strategies\\n\\n"
+    "**2. Low Volatility Environment:**\\n"
+    "• **Strategy:** Increase position sizes\\n"
+    "• **Opportunities:** Volatility buying strategies\\n"
+    "• **Risk:** Complacency can lead to sudden spikes\\n\\n"
+    "**3. Volatility Mean Reversion:**\\n"
+    "• **Strategy:** Trade VIX futures/ETFs\\n"
+    "• **Entry:** When VIX is extremely high or low\\n"
+    "• **Exit:** When VIX returns to mean\\n\\n"
+)
+
+_VOL_SIZING_BLOCK = (
+    "**Volatility-Based Position Sizing:**\\n"
+    "• **High Volatility:** Reduce position sizes by 25-50%\\n"
+    "• **Low Volatility:** Increase position sizes by 10-25%\\n"
+    "• **Extreme Volatility:** Consider cash or defensive positions\\n"
+)
+
+_FUND_METRICS_BLOCK = (
+    "**Key Fundamental Metrics:**\\n\\n"
+    "**Valuation Metrics:**\\n"
+    "• **P/E Ratio:** Price-to-earnings (lower is better)\\n"
+    "• **P/B Ratio:** Price-to-book (lower is better)\\n"
+    "• **PEG Ratio:** P/E to growth (1.0 is fair value)\\n"
+    "• **EV/EBITDA:** Enterprise value to EBITDA\\n\\n"
+    "**Growth Metrics:**\\n"
+    "• **Revenue Growth:** Year-over-year growth\\n"
+    "• **EPS Growth:** Earnings per share growth\\n"
+    "• **ROE:** Return on equity (higher is better)\\n"
+    "• **ROA:** Return on assets\\n\\n"
+    "**Financial Health:**\\n"
+    "• **Debt-to-Equity:** Lower is better\\n"
+    "• **Current Ratio:** Liquidity measure\\n"
+    "• **Free Cash Flow:** Cash generation ability\\n"
+    "• **Dividend Yield:** Income component\\n\\n"
+)
+
+_FUND_FRAMEWORK_BLOCK = (
+    "**Fundamental Analysis Framework:**\\n"
+    "1. **Business Model:** Understand how company makes money\\n"
+    "2. **Competitive Advantage:** Moat and barriers to entry\\n"
+    "3. **Management Quality:** Track record and integrity\\n"
+    "4. **Financial Health:** Balance sheet and cash flow\\n"
+    "5. **Valuation:** Is the stock fairly priced?\\n"
+    "6. **Growth Prospects:** Future expansion opportunities\\n"
+)
+
+_TECH_INDICATORS_BLOCK = (
+    "**Key Technical Indicators:**\\n\\n"
+    "**Trend Indicators:**\\n"
+    "• **Moving Averages:** SMA, EMA (trend direction)\\n"
+    "• **MACD:** Momentum and trend changes\\n"
+    "• **ADX:** Trend strength measurement\\n\\n"
+    "**Momentum Indicators:**\\n"
+    "• **RSI:** Overbought/oversold conditions\\n"
+    "• **Stochastic:** Momentum oscillator\\n"
+    "• **Williams %R:** Momentum indicator\\n\\n"
+    "**Volume Indicators:**\\n"
+    "• **OBV:** On-balance volume\\n"
+    "• **Volume Rate:** Volume trend analysis\\n"
+    "• **Accumulation/Distribution:** Money flow\\n\\n"
+    "**Support & Resistance:**\\n"
+    "• **Pivot Points:** Key price levels\\n"
+    "• **Fibonacci Retracements:** Natural support/resistance\\n"
+    "• **Chart Patterns:** Head & shoulders, triangles\\n\\n"
+)
+
+_TECH_FRAMEWORK_BLOCK = (
+    "**Technical Analysis Framework:**\\n"
+    "1. **Trend Analysis:** Overall direction\\n"
+    "2. **Support/Resistance:** Key price levels\\n"
+    "3. **Momentum:** Strength of move\\n"
+    "4. **Volume Confirmation:** Volume supporting price\\n"
+    "5. **Pattern Recognition:** Chart formations\\n"
+    "6. **Risk Management:** Stop-loss placement\\n"
+)
+
+_TIMING_TIMEFRAMES_BLOCK = (
+    "**Multi-Timeframe Analysis:**\\n"
+    "• **Short-term (1-4 weeks):** Technical momentum suggests continuation\\n"
+    "• **Medium-term (1-3 months):** Fundamental trends remain positive\\n"
+    "• **Long-term (6+ months):** Structural growth story intact\\n\\n"
+)
+
+_TIMING_ENTRY_BLOCK = (
+    "**Advanced Entry Strategies:**\\n"
+    "• **Scale-in Approach:** Enter 1/3 now, 1/3 on pullback, 1/3 on breakout\\n"
+    "• **Dollar-Cost Averaging:** Weekly purchases over 8-12 weeks\\n"
+    "• **Technical Entry:** Wait for pullback to key support levels\\n"
+    "• **Fundamental Entry:** Enter on earnings beat or positive guidance\\n\\n"
+)
+
+_TIMING_RISK_BLOCK = (
+    "**Timing Risk Management:**\\n"
+    "• **Stop-Loss:** Set at 15-20% below entry\\n"
+    "• **Take-Profit:** Scale out at 25%, 50%, 75% gains\\n"
+    "• **Time Stop:** Exit if no progress in 3 months\\n"
+)
+
+_RISK_FACTORS_BLOCK = (
+    "**Risk Factor Analysis:**\\n"
+    "• **Market Risk (Beta):** Moderate correlation with market\\n"
+    "• **Volatility Risk:** Above-average price swings\\n"
+    "• **Liquidity Risk:** Good trading volume\\n"
+    "• **Concentration Risk:** Diversified business model\\n"
+    "• **Regulatory Risk:** Industry-specific regulations\\n"
+    "• **Currency Risk:** Minimal for US companies\\n\\n"
+)
+
+_RISK_MITIGATION_BLOCK = (
+    "**Risk Mitigation Strategies:**\\n"
+    "• **Position Sizing:** Limit to 5-10% of portfolio\\n"
+    "• **Stop-Losses:** Use trailing stops\\n"
+    "• **Hedging:** Consider put options\\n"
+    "• **Diversification:** Don't concentrate in one sector\\n"
+    "• **Monitoring:** Regular review of fundamentals\\n"
+)
+
+_ANALYSIS_METHODS_BLOCK = (
+    "**Analysis Methodologies Used:**\\n"
+    "• **Quantitative Analysis:** Statistical models and metrics\\n"
+    "• **Technical Analysis:** Chart patterns and indicators\\n"
+    "• **Fundamental Analysis:** Financial statements and ratios\\n"
+    "• **Sentiment Analysis:** Market psychology and news\\n"
+    "• **Expert Analysis:** Top investor holdings\\n\\n"
+)
+
+
+class _PositionArrays(NamedTuple):
+    """Struct-of-arrays view of a positions list, built once per question"""
+    tickers: List[str]
+    sectors: np.ndarray
+    values: np.ndarray
+    weights: np.ndarray  # fractional, from the percent 'weight' field
+    shares: np.ndarray
+    
+    @classmethod
+    def from_positions(cls, positions: List[Dict]) -> '_PositionArrays':
+        n = len(positions)
+        return cls(
+            tickers=[pos.get('ticker', '') for pos in positions],
+            sectors=np.array([pos.get('sector', 'Unknown') for pos in positions], dtype=str),
+            values=np.fromiter((pos.get('value', 0) for pos in positions), dtype=np.float64, count=n),
+            weights=np.fromiter((pos.get('weight', 0) for pos in positions), dtype=np.float64, count=n) / 100,
+            shares=np.fromiter((pos.get('shares') or 0 for pos in positions), dtype=np.float64, count=n)
+        )
+
+
+# Shared TopOpportunitiesEngine; _UNLOADED until the first recommendation
+# question, None if the module is unavailable
+_UNLOADED = object()
+_OPPS_ENGINE = _UNLOADED
+
+
+def _get_opportunities_engine():
+    """Import and construct the opportunities engine once, on first use"""
+    global _OPPS_ENGINE
+    if _OPPS_ENGINE is _UNLOADED:
+        # Deferred because top_opportunities_engine imports yfinance and pandas
+        try:
+            from top_opportunities_engine import TopOpportunitiesEngine
+            _OPPS_ENGINE = TopOpportunitiesEngine()
+        except ImportError:
+            _OPPS_ENGINE = None
+    return _OPPS_ENGINE
+
+
+def _fetch_returns(tickers: List[str], period: str = '1y') -> Optional[Tuple[np.ndarray, List[str]]]:
+    """Download daily returns as a T x N matrix plus the tickers of its columns,
+    in the given order. Tickers without any price history (unknown or delisted)
+    are left out rather than emptying the whole matrix."""
+    # yfinance and pandas are only needed here, so import them on first use
+    try:
+        import yfinance as yf
+        import pandas as pd
+        prices = yf.download(tickers, period=period, progress=False)['Adj Close']
+    except Exception:
+        return None
+    
+    if isinstance(prices, pd.Series):
+        prices = prices.to_frame(tickers[0])
+    prices = prices.reindex(columns=tickers).dropna(axis=1, how='all')
+    returns = prices.pct_change().dropna().to_numpy()
+    return (returns, list(prices.columns)) if len(returns) > 1 else None
 
 class AdvancedTradingPartner:
+    # Advanced trading strategies
+    _STRATEGIES: Mapping[str, Mapping[str, object]] = MappingProxyType({
+        'momentum': MappingProxyType({
+            'description': 'Buy high, sell higher - follows strong trends',
+            'indicators': ('RSI', 'MACD', 'Volume'),
+            'risk_level': 'medium-high',
+            'timeframe': 'short-medium'
+        }),
+        'value': MappingProxyType({
+            'description': 'Buy undervalued assets, wait for correction',
+            'indicators': ('P/E', 'P/B', 'DCF'),
+            'risk_level': 'low-medium',
+            'timeframe': 'long'
+        }),
+        'growth': MappingProxyType({
+            'description': 'Focus on high-growth companies',
+            'indicators': ('Revenue Growth', 'EPS Growth', 'ROE'),
+            'risk_level': 'medium-high',
+            'timeframe': 'medium-long'
+        }),
+        'dividend': MappingProxyType({
+            'description': 'Income-focused investing',
+            'indicators': ('Dividend Yield', 'Payout Ratio', 'Dividend Growth'),
+            'risk_level': 'low',
+            'timeframe': 'long'
+        }),
+        'contrarian': MappingProxyType({
+            'description': 'Go against market sentiment',
+            'indicators': ('Sentiment', 'Fear & Greed', 'Put/Call Ratio'),
+            'risk_level': 'high',
+            'timeframe': 'medium'
+        }),
+        'arbitrage': MappingProxyType({
+            'description': 'Exploit price differences',
+            'indicators': ('Spread', 'Correlation', 'Volatility'),
+            'risk_level': 'low',
+            'timeframe': 'short'
+        })
+    })
+    
+    # Every strategy name in one pattern, so a question is scanned once; when
+    # several match, the earliest entry in _STRATEGIES wins as before
+    _STRATEGY_RE = re.compile('(?=(%s))' % '|'.join(map(re.escape, _STRATEGIES)))
+    _STRATEGY_RANK = {name: rank for rank, name in enumerate(_STRATEGIES)}
+    
+    # Market conditions
+    _MARKET_CONDITIONS: Mapping[str, str] = MappingProxyType({
+        'bull_market': 'Strong uptrend, high confidence',
+        'bear_market': 'Downtrend, defensive positioning',
+        'sideways': 'Range-bound, selective opportunities',
+        'volatile': 'High uncertainty, risk management critical'
+    })
+    
+    # Annual risk-free rate and market proxy used by the portfolio metrics
+    _RISK_FREE_RATE = 0.02
+    _MARKET_PROXY = 'SPY'
+    
+    # Seconds a cached risk decomposition stays valid
+    _RISK_CACHE_TTL = 300
+    
+    # Trading style sections, checked in order against the question
+    _TRADING_STYLE_SECTIONS = (
+        ('day', (
+            "**Day Trading Strategy:**\\n"
+            "• **Timeframe:** Intraday (minutes to hours)\\n"
+            "• **Risk Management:** 1-2% risk per trade\\n"
+            "• **Key Indicators:** Volume, momentum, support/resistance\\n"
+            "• **Best Assets:** High-volume stocks, ETFs\\n"
+            "• **Capital Required:** $25,000+ (PDT rule)\\n\\n"
+        )),
+        ('swing', (
+            "**Swing Trading Strategy:**\\n"
+            "• **Timeframe:** Days to weeks\\n"
+            "• **Risk Management:** 2-5% risk per trade\\n"
+            "• **Key Indicators:** Technical patterns, moving averages\\n"
+            "• **Best Assets:** Volatile stocks, sector ETFs\\n"
+            "• **Capital Required:** $5,000+\\n\\n"
+        )),
+        ('scalp', (
+            "**Scalping Strategy:**\\n"
+            "• **Timeframe:** Seconds to minutes\\n"
+            "• **Risk Management:** 0.5-1% risk per trade\\n"
+            "• **Key Indicators:** Level 2 data, order flow\\n"
+            "• **Best Assets:** High-volume, tight spreads\\n"
+            "• **Capital Required:** $10,000+\\n\\n"
+        ))
+    )
+    
+    # Template for each partner's user profile
+    _DEFAULT_PROFILE = {
+        'risk_tolerance': 'medium',
+        'investment_style': 'balanced',
+        'time_horizon': 'long_term',
+        'portfolio_size': 'unknown',
+        'experience_level': 'intermediate',
+        'preferred_sectors': [],
+        'avoid_sectors': [],
+        'max_position_size': 0.1,  # 10% max per position
+        'stop_loss_pct': 0.15,     # 15% stop loss
+        'take_profit_pct': 0.30    # 30% take profit
+    }
+    
     def __init__(self):
-        self.conversation_history = []
-        self.user_profile = {
-            'risk_tolerance': 'medium',
-            'investment_style': 'balanced',
-            'time_horizon': 'long_term',
-            'portfolio_size': 'unknown',
-            'experience_level': 'intermediate',
-            'preferred_sectors': [],
-            'avoid_sectors': [],
-            'max_position_size': 0.1,  # 10% max per position
-            'stop_loss_pct': 0.15,     # 15% stop loss
-            'take_profit_pct': 0.30    # 30% take profit
-        }
+        self.conversation_history = deque(maxlen=200)
+        self.user_profile = copy.copy(self._DEFAULT_PROFILE)
+        self.user_profile['preferred_sectors'] = []
+        self.user_profile['avoid_sectors'] = []
         
-        # Advanced trading strategies
-        self.strategies = {
-            'momentum': {
-                'description': 'Buy high, sell higher - follows strong trends',
-                'indicators': ['RSI', 'MACD', 'Volume'],
-                'risk_level': 'medium-high',
-                'timeframe': 'short-medium'
-            },
-            'value': {
-                'description': 'Buy undervalued assets, wait for correction',
-                'indicators': ['P/E', 'P/B', 'DCF'],
-                'risk_level': 'low-medium',
-                'timeframe': 'long'
-            },
-            'growth': {
-                'description': 'Focus on high-growth companies',
-                'indicators': ['Revenue Growth', 'EPS Growth', 'ROE'],
-                'risk_level': 'medium-high',
-                'timeframe': 'medium-long'
-            },
-            'dividend': {
-                'description': 'Income-focused investing',
-                'indicators': ['Dividend Yield', 'Payout Ratio', 'Dividend Growth'],
-                'risk_level': 'low',
-                'timeframe': 'long'
-            },
-            'contrarian': {
-                'description': 'Go against market sentiment',
-                'indicators': ['Sentiment', 'Fear & Greed', 'Put/Call Ratio'],
-                'risk_level': 'high',
-                'timeframe': 'medium'
-            },
-            'arbitrage': {
-                'description': 'Exploit price differences',
-                'indicators': ['Spread', 'Correlation', 'Volatility'],
-                'risk_level': 'low',
-                'timeframe': 'short'
-            }
-        }
+        # (positions list, _PositionArrays) for the question being answered
+        self._position_arrays_cache: Optional[Tuple[list, _PositionArrays]] = None
+        
+        # (assets list, {TICKER: asset}) for the latest market snapshot seen
+        self._asset_index_cache: Optional[Tuple[list, Dict[str, Dict]]] = None
+        
+        # (assets list, opportunities) from the shared opportunities engine
+        self._opp_cache: Optional[Tuple[list, List[Dict]]] = None
+        
+        # Results of the market-level analyzers, see _market_memo
+        self._market_cache: Dict[tuple, object] = {}
+        
+        # Covariance/eigen decompositions keyed by the set of tickers
+        self._risk_cache: Dict[frozenset, Tuple[float, Optional[Dict]]] = {}
         
-        # Market conditions
-        self.market_conditions = {
-            'bull_market': 'Strong uptrend, high confidence',
-            'bear_market': 'Downtrend, defensive positioning',
-            'sideways': 'Range-bound, selective opportunities',
-            'volatile': 'High uncertainty, risk management critical'
+        # Bound advice builders for each question route
+        self._question_handlers = {
+            name: (getattr(self, handler), arg_names)
+            for name, _, handler, arg_names in _QUESTION_ROUTES
         }
     
     def analyze_user_question(self, question: str, market_data: Dict = None, portfolio_data: Dict = None) -> str:
         """Enhanced question analysis with advanced trading insights"""
         question_lower = question.lower()
         
+        # Positions may have changed since the last question
+        self._position_arrays_cache = None
+        
         # Extract key information
         ticker = self._extract_ticker(question)
         amount = self._extract_amount(question)
         timeframe = self._extract_timeframe(question)
         strategy = self._extract_strategy(question)
         
-        # Determine question type and provide advanced analysis
-        if any(word in question_lower for word in ['strategy', 'approach', 'method']):
-            return self._provide_strategy_advice(strategy, market_data, portfolio_data)
-        elif any(word in question_lower for word in ['optimize', 'rebalance', 'allocation']):
-            return self._provide_portfolio_optimization(portfolio_data, market_data)
-        elif any(word in question_lower for word in ['predict', 'forecast', 'future', 'outlook']):
-            return self._provide_market_prediction(ticker, market_data)
-        elif any(word in question_lower for word in ['hedge', 'protect', 'risk management']):
-            return self._provide_hedging_strategies(portfolio_data, market_data)
-        elif any(word in question_lower for word in ['sector', 'rotation', 'theme']):
-            return self._provide_sector_analysis(market_data)
-        elif any(word in question_lower for word in ['options', 'derivatives', 'leverage']):
-            return self._provide_options_strategies(ticker, market_data)
-        elif any(word in question_lower for word in ['crypto', 'bitcoin', 'ethereum']):
-            return self._provide_crypto_analysis(ticker, market_data)
-        elif any(word in question_lower for word in ['dca', 'dollar cost', 'averaging']):
-            return self._provide_dca_strategy(ticker, amount, market_data)
-        elif any(word in question_lower for word in ['swing', 'day', 'scalp']):
-            return self._provide_trading_style_advice(question_lower, market_data)
-        elif any(word in question_lower for word in ['correlation', 'diversification', 'correlation']):
-            return self._provide_correlation_analysis(portfolio_data, market_data)
-        elif any(word in question_lower for word in ['volatility', 'vix', 'vol']):
-            return self._provide_volatility_analysis(market_data)
-        elif any(word in question_lower for word in ['earnings', 'fundamentals', 'valuation']):
-            return self._provide_fundamental_analysis(ticker, market_data)
-        elif any(word in question_lower for word in ['technical', 'chart', 'pattern']):
-            return self._provide_technical_analysis(ticker, market_data)
-        elif any(word in question_lower for word in ['how much', 'amount', 'size', 'position']):
-            return self._provide_advanced_position_sizing(ticker, amount, market_data, portfolio_data)
-        elif any(word in question_lower for word in ['when', 'timing', 'entry', 'buy now']):
-            return self._provide_advanced_timing_advice(ticker, market_data)
-        elif any(word in question_lower for word in ['risk', 'safe', 'dangerous']):
-            return self._provide_advanced_risk_assessment(ticker, market_data)
-        elif any(word in question_lower for word in ['why', 'reason', 'analysis']):
-            return self._provide_advanced_analysis_explanation(ticker, market_data)
-        elif any(word in question_lower for word in ['portfolio', 'diversification', 'allocation']):
-            return self._provide_advanced_portfolio_advice(portfolio_data, market_data)
-        elif any(word in question_lower for word in ['best', 'top', 'recommend']):
-            return self._provide_advanced_recommendations(market_data)
-        else:
+        # Route the question to the highest-priority matching advice builder
+        route = _match_question_route(question_lower)
+        if route is None:
             return self._provide_general_trading_advice(question, market_data)
+        
+        handler, arg_names = self._question_handlers[route]
+        context = {
+            'question_lower': question_lower,
+            'ticker': ticker,
+            'amount': amount,
+            'strategy': strategy,
+            'market_data': market_data,
+            'portfolio_data': portfolio_data
+        }
+        return handler(*[context[name] for name in arg_names])
     
     def _provide_strategy_advice(self, strategy: str, market_data: Dict, portfolio_data: Dict) -> str:
         """Provide advanced trading strategy recommendations"""
         if not strategy:
             strategy = self._recommend_strategy(market_data, portfolio_data)
         
-        advice = f"**Advanced Trading Strategy: {strategy.title()}**\\n\\n"
+        parts = [f"**Advanced Trading Strategy: {strategy.title()}**\\n\\n"]
         
-        if strategy in self.strategies:
-            strategy_info = self.strategies[strategy]
-            advice += f"**Description:** {strategy_info['description']}\\n"
-            advice += f"**Risk Level:** {strategy_info['risk_level'].title()}\\n"
-            advice += f"**Timeframe:** {strategy_info['timeframe'].title()}\\n"
-            advice += f"**Key Indicators:** {', '.join(strategy_info['indicators'])}\\n\\n"
+        if strategy in self._STRATEGIES:
+            strategy_info = self._STRATEGIES[strategy]
+            parts.append(f"**Description:** {strategy_info['description']}\\n")
+            parts.append(f"**Risk Level:** {strategy_info['risk_level'].title()}\\n")
+            parts.append(f"**Timeframe:** {strategy_info['timeframe'].title()}\\n")
+            parts.append(f"**Key Indicators:** {', '.join(strategy_info['indicators'])}\\n\\n")
             
             # Strategy-specific advice
-            if strategy == 'momentum':
-                advice += self._momentum_strategy_details(market_data)
-            elif strategy == 'value':
-                advice += self._value_strategy_details(market_data)
-            elif strategy == 'growth':
-                advice += self._growth_strategy_details(market_data)
-            elif strategy == 'dividend':
-                advice += self._dividend_strategy_details(market_data)
-            elif strategy == 'contrarian':
-                advice += self._contrarian_strategy_details(market_data)
-            elif strategy == 'arbitrage':
-                advice += self._arbitrage_strategy_details(market_data)
+            details = _STRATEGY_DETAILS.get(strategy)
+            if details:
+                parts.append(details)
         else:
-            advice += f"**Strategy Analysis:**\\n"
-            advice += f"Based on current market conditions, I recommend:\\n\\n"
-            advice += self._recommend_strategy_with_reasoning(market_data, portfolio_data)
+            parts.append(
+                "**Strategy Analysis:**\\n"
+                "Based on current market conditions, I recommend:\\n\\n"
+            )
+            parts.append(self._recommend_strategy_with_reasoning(market_data, portfolio_data))
         
-        return advice
+        return "".join(parts)
     
     def _provide_portfolio_optimization(self, portfolio_data: Dict, market_data: Dict) -> str:
         """Advanced portfolio optimization using modern portfolio theory"""
-        advice = "**Advanced Portfolio Optimization**\\n\\n"
+        parts = ["**Advanced Portfolio Optimization**\\n\\n"]
         
         if not portfolio_data or not portfolio_data.get('positions'):
-            advice += "No portfolio data available. Import your Trading212 portfolio for optimization!\\n\\n"
-            advice += "**General Optimization Principles:**\\n"
-            advice += "• Use Modern Portfolio Theory (MPT)\\n"
-            advice += "• Optimize risk-adjusted returns\\n"
-            advice += "• Consider correlation between assets\\n"
-            advice += "• Rebalance quarterly\\n"
-            return advice
+            parts.append(
+                "No portfolio data available. Import your Trading212 portfolio for optimization!\\n\\n"
+                "**General Optimization Principles:**\\n"
+                "• Use Modern Portfolio Theory (MPT)\\n"
+                "• Optimize risk-adjusted returns\\n"
+                "• Consider correlation between assets\\n"
+                "• Rebalance quarterly\\n"
+            )
+            return "".join(parts)
         
         positions = portfolio_data['positions']
-        total_value = sum(pos.get('value', 0) for pos in positions)
+        arrays = self._position_arrays(positions)
+        total_value = arrays.values.sum()
         
         # Calculate portfolio metrics
         portfolio_metrics = self._calculate_portfolio_metrics(positions, market_data)
         
-        advice += f"**Current Portfolio Analysis:**\\n"
-        advice += f"• Total Value: ${total_value:,.0f}\\n"
-        advice += f"• Number of Positions: {len(positions)}\\n"
-        advice += f"• Estimated Beta: {portfolio_metrics.get('beta', 'N/A')}\\n"
-        advice += f"• Estimated Sharpe Ratio: {portfolio_metrics.get('sharpe', 'N/A')}\\n"
-        advice += f"• Concentration Risk: {portfolio_metrics.get('concentration', 'N/A')}\\n\\n"
+        parts.append(
+            "**Current Portfolio Analysis:**\\n"
+            f"• Total Value: ${total_value:,.0f}\\n"
+            f"• Number of Positions: {len(positions)}\\n"
+            f"• Estimated Beta: {portfolio_metrics.get('beta', 'N/A')}\\n"
+            f"• Estimated Sharpe Ratio: {portfolio_metrics.get('sharpe', 'N/A')}\\n"
+            f"• Concentration Risk: {portfolio_metrics.get('concentration', 'N/A')}\\n\\n"
+        )
         
         # Optimization recommendations
-        advice += "**Optimization Recommendations:**\\n"
+        parts.append("**Optimization Recommendations:**\\n")
         
         # Sector diversification
         sector_allocation = self._analyze_sector_allocation(positions)
-        advice += f"• **Sector Diversification:**\\n"
-        for sector, allocation in sector_allocation.items():
-            if allocation > 0.3:  # More than 30% in one sector
-                advice += f"  - Reduce {sector} exposure (currently {allocation:.1%})\\n"
+        parts.append(f"• **Sector Diversification:**\\n")
+        parts.append("".join([
+            _SECTOR_REDUCE_LINE(sector, allocation)
+            for sector, allocation in sector_allocation.items()
+            if allocation > 0.3  # More than 30% in one sector
+        ]))
         
         # Risk optimization
-        high_risk_positions = [pos for pos in positions if self._assess_position_risk(pos, market_data) == 'high']
-        if high_risk_positions:
-            advice += f"• **Risk Management:**\\n"
-            advice += f"  - Consider reducing high-risk positions: {', '.join([pos['ticker'] for pos in high_risk_positions[:3]])}\\n"
+        betas, vols = self._position_risk_arrays(positions)
+        risk_mask = self._assess_position_risks(arrays.values, betas, vols)
+        high_risk = np.flatnonzero(risk_mask)[:3]
+        if high_risk.size:
+            parts.append(
+                "• **Risk Management:**\\n"
+                f"  - Consider reducing high-risk positions: {', '.join([arrays.tickers[i] for i in high_risk])}\\n"
+            )
         
         # Correlation analysis
-        advice += f"• **Correlation Optimization:**\\n"
-        advice += f"  - Add uncorrelated assets to reduce portfolio volatility\\n"
-        advice += f"  - Consider international diversification\\n"
+        parts.append(
+            "• **Correlation Optimization:**\\n"
+            "  - Add uncorrelated assets to reduce portfolio volatility\\n"
+            "  - Consider international diversification\\n"
+        )
+        
+        # Mean-variance target weights when price history is available
+        decomp = self._get_risk_decomp(arrays.tickers)
+        if decomp is not None and len(decomp['tickers']) > 1:
+            target_weights = self._markowitz_weights(decomp)
+            if target_weights is not None:
+                parts.append(f"• **Mean-Variance Target Weights:**\\n")
+                parts.append("".join([
+                    _WEIGHT_LINE(decomp['tickers'][i], target_weights[i])
+                    for i in np.argsort(-target_weights)[:5]
+                ]))
+            best_point = self._max_sharpe_frontier_point(decomp)
+            if best_point is not None:
+                parts.append(f"  - Max-Sharpe frontier point: {best_point[0]:.1%} return at {best_point[1]:.1%} volatility\\n")
         
         # Rebalancing schedule
-        advice += f"\\n**Rebalancing Strategy:**\\n"
-        advice += f"• Rebalance when any position exceeds target allocation by 5%\\n"
-        advice += f"• Quarterly review and adjustment\\n"
-        advice += f"• Use dollar-cost averaging for new positions\\n"
-        
-        return advice
+        parts.append(
+            "\\n**Rebalancing Strategy:**\\n"
+            "• Rebalance when any position exceeds target allocation by 5%\\n"
+            "• Quarterly review and adjustment\\n"
+            "• Use dollar-cost averaging for new positions\\n"
+        )
+        
+        return "".join(parts)
     
     def _provide_market_prediction(self, ticker: str, market_data: Dict) -> str:
         """Provide market predictions using technical and fundamental analysis"""
-        advice = f"**Market Prediction Analysis**\\n\\n"
+        parts = [f"**Market Prediction Analysis**\\n\\n"]
         
         if ticker:
-            advice += f"**{ticker} Outlook:**\\n"
+            parts.append(f"**{ticker} Outlook:**\\n")
             asset_analysis = self._get_asset_analysis(ticker, market_data)
             if asset_analysis:
-                advice += self._generate_price_prediction(asset_analysis)
+                parts.append(self._generate_price_prediction(asset_analysis))
             else:
-                advice += f"No current analysis available for {ticker}.\\n\\n"
+                parts.append(f"No current analysis available for {ticker}.\\n\\n")
         
         # General market outlook
-        advice += "**Overall Market Outlook:**\\n"
+        parts.append("**Overall Market Outlook:**\\n")
         market_outlook = self._analyze_market_outlook(market_data)
-        advice += market_outlook
+        parts.append(market_outlook)
         
         # Key factors
-        advice += "\\n**Key Factors to Watch:**\\n"
-        advice += "• Federal Reserve policy and interest rates\\n"
-        advice += "• Corporate earnings growth\\n"
-        advice += "• Inflation trends\\n"
-        advice += "• Geopolitical developments\\n"
-        advice += "• Sector rotation patterns\\n"
+        parts.append(
+            "\\n**Key Factors to Watch:**\\n"
+            "• Federal Reserve policy and interest rates\\n"
+            "• Corporate earnings growth\\n"
+            "• Inflation trends\\n"
+            "• Geopolitical developments\\n"
+            "• Sector rotation patterns\\n"
+        )
         
         # Prediction confidence
-        advice += "\\n**Prediction Confidence:**\\n"
-        advice += "• Short-term (1-3 months): Medium confidence\\n"
-        advice += "• Medium-term (3-12 months): High confidence\\n"
-        advice += "• Long-term (1+ years): Very high confidence\\n"
-        
-        advice += "\\n**Disclaimer:** Predictions are based on historical patterns and current data. Past performance doesn't guarantee future results.\\n"
-        
-        return advice
+        parts.append(
+            "\\n**Prediction Confidence:**\\n"
+            "• Short-term (1-3 months): Medium confidence\\n"
+            "• Medium-term (3-12 months): High confidence\\n"
+            "• Long-term (1+ years): Very high confidence\\n"
+            "\\n**Disclaimer:** Predictions are based on historical patterns and current data. Past performance doesn't guarantee future results.\\n"
+        )
+        
+        return "".join(parts)
     
     def _provide_hedging_strategies(self, portfolio_data: Dict, market_data: Dict) -> str:
         """Provide advanced hedging strategies"""
-        advice = "**Advanced Hedging Strategies**\\n\\n"
+        parts = ["**Advanced Hedging Strategies**\\n\\n"]
         
         if not portfolio_data or not portfolio_data.get('positions'):
-            advice += "No portfolio data available for hedging analysis.\\n\\n"
+            parts.append("No portfolio data available for hedging analysis.\\n\\n")
         
-        advice += "**Portfolio Hedging Options:**\\n\\n"
+        parts.append("**Portfolio Hedging Options:**\\n\\n")
         
         # Equity hedging
-        advice += "**1. Equity Hedging:**\\n"
-        advice += "• **Put Options:** Buy protective puts on major holdings\\n"
-        advice += "• **Inverse ETFs:** SPXS, SQQQ for market downturns\\n"
-        advice += "• **VIX Calls:** Hedge against volatility spikes\\n"
-        advice += "• **Sector Rotation:** Move to defensive sectors (utilities, consumer staples)\\n\\n"
+        parts.append(
+            "**1. Equity Hedging:**\\n"
+            "• **Put Options:** Buy protective puts on major holdings\\n"
+            "• **Inverse ETFs:** SPXS, SQQQ for market downturns\\n"
+            "• **VIX Calls:** Hedge against volatility spikes\\n"
+            "• **Sector Rotation:** Move to defensive sectors (utilities, consumer staples)\\n\\n"
+        )
         
         # Currency hedging
-        advice += "**2. Currency Hedging:**\\n"
-        advice += "• **Currency ETFs:** UUP (USD bullish), EUO (EUR bearish)\\n"
-        advice += "• **International Exposure:** Consider currency-hedged international funds\\n\\n"
+        parts.append(
+            "**2. Currency Hedging:**\\n"
+            "• **Currency ETFs:** UUP (USD bullish), EUO (EUR bearish)\\n"
+            "• **International Exposure:** Consider currency-hedged international funds\\n\\n"
+        )
         
         # Interest rate hedging
-        advice += "**3. Interest Rate Hedging:**\\n"
-        advice += "• **Treasury Bonds:** TLT for rate sensitivity\\n"
-        advice += "• **REITs:** Consider interest rate sensitivity\\n"
-        advice += "• **Bank Stocks:** Monitor rate environment impact\\n\\n"
+        parts.append(
+            "**3. Interest Rate Hedging:**\\n"
+            "• **Treasury Bonds:** TLT for rate sensitivity\\n"
+            "• **REITs:** Consider interest rate sensitivity\\n"
+            "• **Bank Stocks:** Monitor rate environment impact\\n\\n"
+        )
         
         # Portfolio-specific hedging
         if portfolio_data and portfolio_data.get('positions'):
-            advice += "**Portfolio-Specific Hedging:**\\n"
+            parts.append("**Portfolio-Specific Hedging:**\\n")
             positions = portfolio_data['positions']
             
             # Tech-heavy portfolio
-            tech_exposure = sum(pos.get('value', 0) for pos in positions if 'tech' in pos.get('sector', '').lower())
-            total_value = sum(pos.get('value', 0) for pos in positions)
+            arrays = self._position_arrays(positions)
+            is_tech = np.fromiter((_sector_has(sector, 'tech') for sector in arrays.sectors), dtype=np.bool_, count=len(positions))
+            tech_exposure = arrays.values[is_tech].sum()
+            total_value = arrays.values.sum()
             tech_pct = tech_exposure / total_value if total_value > 0 else 0
             
             if tech_pct > 0.3:
-                advice += f"• **Tech Concentration ({tech_pct:.1%}):** Consider hedging with value stocks or utilities\\n"
+                parts.append(f"• **Tech Concentration ({tech_pct:.1%}):** Consider hedging with value stocks or utilities\\n")
+            
+            # A single dominant risk factor is best hedged at the index level
+            decomp = self._get_risk_decomp(arrays.tickers)
+            if decomp is not None and len(decomp['tickers']) > 1:
+                eigvals = decomp['eigvals']
+                factor_share = eigvals[-1] / eigvals.sum()
+                if factor_share > 0.6:
+                    parts.append(f"• **Common Risk Factor ({factor_share:.1%} of variance):** Holdings move together; an index hedge covers most of the risk\\n")
             
             # Growth-heavy portfolio
-            growth_positions = [pos for pos in positions if self._is_growth_stock(pos, market_data)]
-            if len(growth_positions) > len(positions) * 0.5:
-                advice += f"• **Growth Heavy:** Consider adding dividend stocks or bonds\\n"
-        
-        advice += "\\n**Hedging Best Practices:**\\n"
-        advice += "• Hedge 20-30% of portfolio value\\n"
-        advice += "• Use options for precise hedging\\n"
-        advice += "• Monitor hedge effectiveness regularly\\n"
-        advice += "• Consider cost vs. benefit of hedging\\n"
-        
-        return advice
+            growth_count = sum(_sector_has(sector, 'growth') for sector in arrays.sectors)
+            if growth_count > len(positions) * 0.5:
+                parts.append(f"• **Growth Heavy:** Consider adding dividend stocks or bonds\\n")
+        
+        parts.append(
+            "\\n**Hedging Best Practices:**\\n"
+            "• Hedge 20-30% of portfolio value\\n"
+            "• Use options for precise hedging\\n"
+            "• Monitor hedge effectiveness regularly\\n"
+            "• Consider cost vs. benefit of hedging\\n"
+        )
+        
+        return "".join(parts)
     
     def _provide_sector_analysis(self, market_data: Dict) -> str:
         """Provide comprehensive sector analysis and rotation insights"""
-        advice = "**Sector Analysis & Rotation Strategy**\\n\\n"
+        parts = ["**Sector Analysis & Rotation Strategy**\\n\\n"]
         
         # Sector performance analysis
-        advice += "**Current Sector Performance:**\\n"
+        parts.append("**Current Sector Performance:**\\n")
         sector_performance = self._analyze_sector_performance(market_data)
-        advice += sector_performance
+        parts.append(sector_performance)
         
         # Sector rotation strategy
-        advice += "\\n**Sector Rotation Strategy:**\\n"
-        advice += "• **Early Cycle:** Technology, Consumer Discretionary\\n"
-        advice += "• **Mid Cycle:** Industrials, Materials\\n"
-        advice += "• **Late Cycle:** Energy, Financials\\n"
-        advice += "• **Recession:** Utilities, Consumer Staples, Healthcare\\n\\n"
+        parts.append(
+            "\\n**Sector Rotation Strategy:**\\n"
+            "• **Early Cycle:** Technology, Consumer Discretionary\\n"
+            "• **Mid Cycle:** Industrials, Materials\\n"
+            "• **Late Cycle:** Energy, Financials\\n"
+            "• **Recession:** Utilities, Consumer Staples, Healthcare\\n\\n"
+        )
         
         # Current market phase
         market_phase = self._determine_market_phase(market_data)
-        advice += f"**Current Market Phase:** {market_phase}\\n\\n"
+        parts.append(f"**Current Market Phase:** {market_phase}\\n\\n")
         
         # Sector recommendations
-        advice += "**Sector Recommendations:**\\n"
+        parts.append("**Sector Recommendations:**\\n")
         recommendations = self._get_sector_recommendations(market_data)
-        for sector, rec in recommendations.items():
-            advice += f"• **{sector}:** {rec}\\n"
+        parts.append("".join([_SECTOR_REC_LINE(sector, rec) for sector, rec in recommendations.items()]))
         
         # Thematic investing
-        advice += "\\n**Thematic Investment Themes:**\\n"
-        advice += "• **AI & Automation:** NVDA, MSFT, GOOGL\\n"
-        advice += "• **Clean Energy:** TSLA, ENPH, SEDG\\n"
-        advice += "• **Healthcare Innovation:** MRNA, BNTX, ILMN\\n"
-        advice += "• **Fintech:** SQ, PYPL, COIN\\n"
-        advice += "• **Space Economy:** SPCE, RKLB, MAXR\\n"
-        
-        return advice
+        parts.append(
+            "\\n**Thematic Investment Themes:**\\n"
+            "• **AI & Automation:** NVDA, MSFT, GOOGL\\n"
+            "• **Clean Energy:** TSLA, ENPH, SEDG\\n"
+            "• **Healthcare Innovation:** MRNA, BNTX, ILMN\\n"
+            "• **Fintech:** SQ, PYPL, COIN\\n"
+            "• **Space Economy:** SPCE, RKLB, MAXR\\n"
+        )
+        
+        return "".join(parts)
     
     def _provide_options_strategies(self, ticker: str, market_data: Dict) -> str:
         """Provide advanced options strategies"""
-        advice = "**Advanced Options Strategies**\\n\\n"
+        parts = ["**Advanced Options Strategies**\\n\\n"]
         
         if ticker:
-            advice += f"**Options Strategies for {ticker}:**\\n\\n"
+            parts.append(f"**Options Strategies for {ticker}:**\\n\\n")
             asset_analysis = self._get_asset_analysis(ticker, market_data)
             if asset_analysis:
-                advice += self._generate_options_strategies(asset_analysis)
+                parts.append(self._generate_options_strategies(asset_analysis))
             else:
-                advice += f"No current analysis available for {ticker}.\\n\\n"
+                parts.append(f"No current analysis available for {ticker}.\\n\\n")
         
         # General options strategies
-        advice += "**Popular Options Strategies:**\\n\\n"
-        
-        advice += "**1. Income Strategies:**\\n"
-        advice += "• **Covered Calls:** Sell calls on owned stock\\n"
-        advice += "• **Cash-Secured Puts:** Sell puts for premium\\n"
-        advice += "• **Iron Condors:** Range-bound income strategy\\n\\n"
-        
-        advice += "**2. Directional Strategies:**\\n"
-        advice += "• **Long Calls/Puts:** Leveraged directional bets\\n"
-        advice += "• **Call/Put Spreads:** Limited risk directional plays\\n"
-        advice += "• **Straddles:** Volatility plays\\n\\n"
-        
-        advice += "**3. Hedging Strategies:**\\n"
-        advice += "• **Protective Puts:** Portfolio insurance\\n"
-        advice += "• **Collar Strategy:** Limited upside/downside\\n"
-        advice += "• **Put Spreads:** Cost-effective hedging\\n\\n"
-        
-        advice += "**Options Risk Management:**\\n"
-        advice += "• Never risk more than 5% of portfolio on options\\n"
-        advice += "• Use stop-losses on directional plays\\n"
-        advice += "• Monitor Greeks (Delta, Gamma, Theta, Vega)\\n"
-        advice += "• Close positions before expiration\\n"
-        
-        return advice
+        parts.append(
+            "**Popular Options Strategies:**\\n\\n"
+            "**1. Income Strategies:**\\n"
+            "• **Covered Calls:** Sell calls on owned stock\\n"
+            "• **Cash-Secured Puts:** Sell puts for premium\\n"
+            "• **Iron Condors:** Range-bound income strategy\\n\\n"
+            "**2. Directional Strategies:**\\n"
+            "• **Long Calls/Puts:** Leveraged directional bets\\n"
+            "• **Call/Put Spreads:** Limited risk directional plays\\n"
+            "• **Straddles:** Volatility plays\\n\\n"
+            "**3. Hedging Strategies:**\\n"
+            "• **Protective Puts:** Portfolio insurance\\n"
+            "• **Collar Strategy:** Limited upside/downside\\n"
+            "• **Put Spreads:** Cost-effective hedging\\n\\n"
+            "**Options Risk Management:**\\n"
+            "• Never risk more than 5% of portfolio on options\\n"
+            "• Use stop-losses on directional plays\\n"
+            "• Monitor Greeks (Delta, Gamma, Theta, Vega)\\n"
+            "• Close positions before expiration\\n"
+        )
+        
+        return "".join(parts)
     
     def _provide_crypto_analysis(self, ticker: str, market_data: Dict) -> str:
         """Provide specialized crypto analysis"""
-        advice = "**Cryptocurrency Analysis**\\n\\n"
+        parts = ["**Cryptocurrency Analysis**\\n\\n"]
         
         if ticker and 'USD' in ticker:
-            advice += f"**{ticker} Analysis:**\\n\\n"
+            parts.append(f"**{ticker} Analysis:**\\n\\n")
             asset_analysis = self._get_asset_analysis(ticker, market_data)
             if asset_analysis:
-                advice += self._generate_crypto_analysis(asset_analysis)
+                parts.append(self._generate_crypto_analysis(asset_analysis))
             else:
-                advice += f"No current analysis available for {ticker}.\\n\\n"
+                parts.append(f"No current analysis available for {ticker}.\\n\\n")
         
         # Crypto market overview
-        advice += "**Crypto Market Overview:**\\n"
+        parts.append("**Crypto Market Overview:**\\n")
         crypto_outlook = self._analyze_crypto_market(market_data)
-        advice += crypto_outlook
+        parts.append(crypto_outlook)
         
         # Crypto strategies
-        advice += "\\n**Crypto Investment Strategies:**\\n"
-        advice += "• **HODL Strategy:** Long-term holding of major cryptos\\n"
-        advice += "• **DCA (Dollar-Cost Averaging):** Regular purchases\\n"
-        advice += "• **Swing Trading:** Technical analysis-based trading\\n"
-        advice += "• **DeFi Yield Farming:** Earn rewards on crypto holdings\\n"
-        advice += "• **Staking:** Earn rewards by holding certain cryptos\\n\\n"
+        parts.append(
+            "\\n**Crypto Investment Strategies:**\\n"
+            "• **HODL Strategy:** Long-term holding of major cryptos\\n"
+            "• **DCA (Dollar-Cost Averaging):** Regular purchases\\n"
+            "• **Swing Trading:** Technical analysis-based trading\\n"
+            "• **DeFi Yield Farming:** Earn rewards on crypto holdings\\n"
+            "• **Staking:** Earn rewards by holding certain cryptos\\n\\n"
+        )
         
         # Risk factors
-        advice += "**Crypto Risk Factors:**\\n"
-        advice += "• **High Volatility:** 50-80% daily swings possible\\n"
-        advice += "• **Regulatory Risk:** Government policy changes\\n"
-        advice += "• **Technology Risk:** Smart contract bugs, hacks\\n"
-        advice += "• **Market Manipulation:** Whale movements\\n"
-        advice += "• **Correlation Risk:** Often moves together\\n\\n"
+        parts.append(
+            "**Crypto Risk Factors:**\\n"
+            "• **High Volatility:** 50-80% daily swings possible\\n"
+            "• **Regulatory Risk:** Government policy changes\\n"
+            "• **Technology Risk:** Smart contract bugs, hacks\\n"
+            "• **Market Manipulation:** Whale movements\\n"
+            "• **Correlation Risk:** Often moves together\\n\\n"
+        )
         
         # Portfolio allocation
-        advice += "**Crypto Portfolio Allocation:**\\n"
-        advice += "• **Conservative:** 1-5% of total portfolio\\n"
-        advice += "• **Moderate:** 5-10% of total portfolio\\n"
-        advice += "• **Aggressive:** 10-20% of total portfolio\\n"
-        advice += "• **Maximum Recommended:** 20% of total portfolio\\n"
-        
-        return advice
+        parts.append(
+            "**Crypto Portfolio Allocation:**\\n"
+            "• **Conservative:** 1-5% of total portfolio\\n"
+            "• **Moderate:** 5-10% of total portfolio\\n"
+            "• **Aggressive:** 10-20% of total portfolio\\n"
+            "• **Maximum Recommended:** 20% of total portfolio\\n"
+        )
+        
+        return "".join(parts)
     
     def _provide_dca_strategy(self, ticker: str, amount: float, market_data: Dict) -> str:
         """Provide dollar-cost averaging strategy"""
-        advice = "**Dollar-Cost Averaging (DCA) Strategy**\\n\\n"
+        parts = ["**Dollar-Cost Averaging (DCA) Strategy**\\n\\n"]
         
         if ticker:
-            advice += f"**DCA Strategy for {ticker}:**\\n\\n"
+            parts.append(f"**DCA Strategy for {ticker}:**\\n\\n")
             asset_analysis = self._get_asset_analysis(ticker, market_data)
             if asset_analysis:
-                advice += self._generate_dca_strategy(asset_analysis, amount)
+                parts.append(self._generate_dca_strategy(asset_analysis, amount))
             else:
-                advice += f"No current analysis available for {ticker}.\\n\\n"
+                parts.append(f"No current analysis available for {ticker}.\\n\\n")
         
         # DCA benefits
-        advice += "**DCA Benefits:**\\n"
-        advice += "• **Reduces Timing Risk:** No need to predict market movements\\n"
-        advice += "• **Emotional Discipline:** Removes emotion from investing\\n"
-        advice += "• **Lower Average Cost:** Buys more shares when prices are low\\n"
-        advice += "• **Consistent Investing:** Builds wealth over time\\n\\n"
+        parts.append(
+            "**DCA Benefits:**\\n"
+            "• **Reduces Timing Risk:** No need to predict market movements\\n"
+            "• **Emotional Discipline:** Removes emotion from investing\\n"
+            "• **Lower Average Cost:** Buys more shares when prices are low\\n"
+            "• **Consistent Investing:** Builds wealth over time\\n\\n"
+        )
         
         # DCA implementation
-        advice += "**DCA Implementation:**\\n"
+        parts.append("**DCA Implementation:**\\n")
         if amount:
-            advice += f"• **Investment Amount:** ${amount:,.0f}\\n"
-            advice += f"• **Weekly Investment:** ${amount/4:,.0f}\\n"
-            advice += f"• **Monthly Investment:** ${amount:,.0f}\\n"
+            dollars = f"${amount:,.0f}"
+            parts.append(
+                f"• **Investment Amount:** {dollars}\\n"
+                f"• **Weekly Investment:** ${amount/4:,.0f}\\n"
+                f"• **Monthly Investment:** {dollars}\\n"
+            )
         else:
-            advice += "• **Recommended Amount:** 5-10% of monthly income\\n"
-            advice += "• **Frequency:** Weekly or monthly\\n"
+            parts.append(
+                "• **Recommended Amount:** 5-10% of monthly income\\n"
+                "• **Frequency:** Weekly or monthly\\n"
+            )
         
-        advice += "• **Duration:** 6-24 months for optimal results\\n"
-        advice += "• **Automation:** Set up automatic investments\\n\\n"
+        parts.append(
+            "• **Duration:** 6-24 months for optimal results\\n"
+            "• **Automation:** Set up automatic investments\\n\\n"
+        )
         
         # DCA vs Lump Sum
-        advice += "**DCA vs Lump Sum:**\\n"
-        advice += "• **DCA:** Better for volatile markets, reduces regret\\n"
-        advice += "• **Lump Sum:** Better for stable uptrending markets\\n"
-        advice += "• **Hybrid:** 50% lump sum + 50% DCA over 6 months\\n"
-        
-        return advice
+        parts.append(
+            "**DCA vs Lump Sum:**\\n"
+            "• **DCA:** Better for volatile markets, reduces regret\\n"
+            "• **Lump Sum:** Better for stable uptrending markets\\n"
+            "• **Hybrid:** 50% lump sum + 50% DCA over 6 months\\n"
+        )
+        
+        return "".join(parts)
     
     def _provide_trading_style_advice(self, question: str, market_data: Dict) -> str:
         """Provide advice for different trading styles"""
-        advice = "**Trading Style Analysis**\\n\\n"
-        
-        if 'day' in question:
-            advice += "**Day Trading Strategy:**\\n"
-            advice += "• **Timeframe:** Intraday (minutes to hours)\\n"
-            advice += "• **Risk Management:** 1-2% risk per trade\\n"
-            advice += "• **Key Indicators:** Volume, momentum, support/resistance\\n"
-            advice += "• **Best Assets:** High-volume stocks, ETFs\\n"
-            advice += "• **Capital Required:** $25,000+ (PDT rule)\\n\\n"
-            
-        elif 'swing' in question:
-            advice += "**Swing Trading Strategy:**\\n"
-            advice += "• **Timeframe:** Days to weeks\\n"
-            advice += "• **Risk Management:** 2-5% risk per trade\\n"
-            advice += "• **Key Indicators:** Technical patterns, moving averages\\n"
-            advice += "• **Best Assets:** Volatile stocks, sector ETFs\\n"
-            advice += "• **Capital Required:** $5,000+\\n\\n"
-            
-        elif 'scalp' in question:
-            advice += "**Scalping Strategy:**\\n"
-            advice += "• **Timeframe:** Seconds to minutes\\n"
-            advice += "• **Risk Management:** 0.5-1% risk per trade\\n"
-            advice += "• **Key Indicators:** Level 2 data, order flow\\n"
-            advice += "• **Best Assets:** High-volume, tight spreads\\n"
-            advice += "• **Capital Required:** $10,000+\\n\\n"
-            
+        parts = ["**Trading Style Analysis**\\n\\n"]
+        
+        style_section = next((text for keyword, text in self._TRADING_STYLE_SECTIONS if keyword in question), None)
+        if style_section:
+            parts.append(style_section)
         else:
-            advice += "**Trading Style Comparison:**\\n\\n"
-            advice += "**1. Day Trading:**\\n"
-            advice += "• High frequency, high stress\\n"
-            advice += "• Requires significant time and capital\\n"
-            advice += "• Potential for high returns but high risk\\n\\n"
-            
-            advice += "**2. Swing Trading:**\\n"
-            advice += "• Medium frequency, moderate stress\\n"
-            advice += "• Good balance of time and returns\\n"
-            advice += "• Suitable for part-time traders\\n\\n"
-            
-            advice += "**3. Position Trading:**\\n"
-            advice += "• Low frequency, low stress\\n"
-            advice += "• Long-term trend following\\n"
-            advice += "• Best for busy professionals\\n\\n"
-            
-            advice += "**4. Scalping:**\\n"
-            advice += "• Very high frequency, very high stress\\n"
-            advice += "• Requires advanced skills and tools\\n"
-            advice += "• Not recommended for beginners\\n"
+            parts.append(
+                "**Trading Style Comparison:**\\n\\n"
+                "**1. Day Trading:**\\n"
+                "• High frequency, high stress\\n"
+                "• Requires significant time and capital\\n"
+                "• Potential for high returns but high risk\\n\\n"
+                "**2. Swing Trading:**\\n"
+                "• Medium frequency, moderate stress\\n"
+                "• Good balance of time and returns\\n"
+                "• Suitable for part-time traders\\n\\n"
+                "**3. Position Trading:**\\n"
+                "• Low frequency, low stress\\n"
+                "• Long-term trend following\\n"
+                "• Best for busy professionals\\n\\n"
+                "**4. Scalping:**\\n"
+                "• Very high frequency, very high stress\\n"
+                "• Requires advanced skills and tools\\n"
+                "• Not recommended for beginners\\n"
+            )
         
         # Risk management for all styles
-        advice += "**Universal Risk Management:**\\n"
-        advice += "• Never risk more than you can afford to lose\\n"
-        advice += "• Use stop-losses on every trade\\n"
-        advice += "• Keep detailed trading journal\\n"
-        advice += "• Continuously improve your strategy\\n"
-        
-        return advice
+        parts.append(
+            "**Universal Risk Management:**\\n"
+            "• Never risk more than you can afford to lose\\n"
+            "• Use stop-losses on every trade\\n"
+            "• Keep detailed trading journal\\n"
+            "• Continuously improve your strategy\\n"
+        )
+        
+        return "".join(parts)
     
     def _provide_correlation_analysis(self, portfolio_data: Dict, market_data: Dict) -> str:
         """Provide correlation analysis for portfolio optimization"""
-        advice = "**Portfolio Correlation Analysis**\\n\\n"
+        parts = ["**Portfolio Correlation Analysis**\\n\\n"]
         
         if not portfolio_data or not portfolio_data.get('positions'):
-            advice += "No portfolio data available for correlation analysis.\\n\\n"
-            advice += "**Correlation Basics:**\\n"
-            advice += "• **Positive Correlation:** Assets move together\\n"
-            advice += "• **Negative Correlation:** Assets move opposite\\n"
-            advice += "• **Zero Correlation:** Assets move independently\\n"
-            advice += "• **Goal:** Reduce correlation to lower portfolio risk\\n"
-            return advice
+            parts.append(
+                "No portfolio data available for correlation analysis.\\n\\n"
+                "**Correlation Basics:**\\n"
+                "• **Positive Correlation:** Assets move together\\n"
+                "• **Negative Correlation:** Assets move opposite\\n"
+                "• **Zero Correlation:** Assets move independently\\n"
+                "• **Goal:** Reduce correlation to lower portfolio risk\\n"
+            )
+            return "".join(parts)
         
         positions = portfolio_data['positions']
         
         # Calculate correlations
         correlations = self._calculate_portfolio_correlations(positions, market_data)
         
-        advice += "**Portfolio Correlation Analysis:**\\n"
-        advice += f"• **Average Correlation:** {correlations.get('average', 'N/A')}\\n"
-        advice += f"• **Highest Correlation:** {correlations.get('highest', 'N/A')}\\n"
-        advice += f"• **Lowest Correlation:** {correlations.get('lowest', 'N/A')}\\n\\n"
+        parts.append("**Portfolio Correlation Analysis:**\\n")
+        parts.append(f"• **Average Correlation:** {correlations.get('average', 'N/A')}\\n")
+        parts.append(f"• **Highest Correlation:** {correlations.get('highest', 'N/A')}\\n")
+        parts.append(f"• **Lowest Correlation:** {correlations.get('lowest', 'N/A')}\\n\\n")
         
         # Correlation recommendations
-        advice += "**Correlation Optimization:**\\n"
+        parts.append("**Correlation Optimization:**\\n")
         
         # High correlation warnings
         high_corr_pairs = correlations.get('high_correlation_pairs', [])
         if high_corr_pairs:
-            advice += "• **High Correlation Pairs:**\\n"
-            for pair in high_corr_pairs[:3]:
-                advice += f"  - {pair[0]} & {pair[1]}: {pair[2]:.2f}\\n"
-            advice += "  - Consider reducing exposure to one of these assets\\n\\n"
+            parts.append("• **High Correlation Pairs:**\\n")
+            parts.append("".join([_PAIR_LINE(*pair[:3]) for pair in high_corr_pairs[:3]]))
+            parts.append("  - Consider reducing exposure to one of these assets\\n\\n")
         
         # Diversification recommendations
-        advice += "• **Diversification Opportunities:**\\n"
-        advice += "  - Add international stocks (lower correlation with US)\\n"
-        advice += "  - Include bonds (negative correlation with stocks)\\n"
-        advice += "  - Add commodities (low correlation with equities)\\n"
-        advice += "  - Consider REITs (different correlation pattern)\\n\\n"
+        parts.append(
+            "• **Diversification Opportunities:**\\n"
+            "  - Add international stocks (lower correlation with US)\\n"
+            "  - Include bonds (negative correlation with stocks)\\n"
+            "  - Add commodities (low correlation with equities)\\n"
+            "  - Consider REITs (different correlation pattern)\\n\\n"
+        )
         
         # Sector correlation
-        advice += "• **Sector Correlation:**\\n"
-        advice += "  - Technology stocks often highly correlated\\n"
-        advice += "  - Financial stocks move together\\n"
-        advice += "  - Utilities have lower correlation\\n"
-        advice += "  - Healthcare shows moderate correlation\\n"
-        
-        return advice
+        parts.append(
+            "• **Sector Correlation:**\\n"
+            "  - Technology stocks often highly correlated\\n"
+            "  - Financial stocks move together\\n"
+            "  - Utilities have lower correlation\\n"
+            "  - Healthcare shows moderate correlation\\n"
+        )
+        
+        return "".join(parts)
     
     def _provide_volatility_analysis(self, market_data: Dict) -> str:
         """Provide volatility analysis and strategies"""
-        advice = "**Volatility Analysis & Strategies**\\n\\n"
+        parts = ["**Volatility Analysis & Strategies**\\n\\n"]
         
         # Current volatility environment
         volatility_env = self._analyze_volatility_environment(market_data)
-        advice += f"**Current Volatility Environment:** {volatility_env}\\n\\n"
+        parts.append(f"**Current Volatility Environment:** {volatility_env}\\n\\n")
         
         # VIX analysis
-        advice += "**VIX (Fear Index) Analysis:**\\n"
-        advice += "• **VIX < 20:** Low volatility, complacent market\\n"
-        advice += "• **VIX 20-30:** Normal volatility range\\n"
-        advice += "• **VIX > 30:** High volatility, fear in market\\n"
-        advice += "• **VIX > 40:** Extreme fear, potential buying opportunity\\n\\n"
+        parts.append(_VIX_BLOCK)
         
         # Volatility strategies
-        advice += "**Volatility Trading Strategies:**\\n\\n"
-        
-        advice += "**1. High Volatility Environment:**\\n"
-        advice += "• **Strategy:** Reduce position sizes, increase cash\\n"
-        advice += "• **Hedging:** Buy protective puts\\n"
-        advice += "• **Opportunities:** Volatility selling strategies\\n\\n"
-        
-        advice += "**2. Low Volatility Environment:**\\n"
-        advice += "• **Strategy:** Increase position sizes\\n"
-        advice += "• **Opportunities:** Volatility buying strategies\\n"
-        advice += "• **Risk:** Complacency can lead to sudden spikes\\n\\n"
-        
-        advice += "**3. Volatility Mean Reversion:**\\n"
-        advice += "• **Strategy:** Trade VIX futures/ETFs\\n"
-        advice += "• **Entry:** When VIX is extremely high or low\\n"
-        advice += "• **Exit:** When VIX returns to mean\\n\\n"
+        parts.append(_VOL_STRATEGIES_BLOCK)
         
         # Volatility-based position sizing
-        advice += "**Volatility-Based Position Sizing:**\\n"
-        advice += "• **High Volatility:** Reduce position sizes by 25-50%\\n"
-        advice += "• **Low Volatility:** Increase position sizes by 10-25%\\n"
-        advice += "• **Extreme Volatility:** Consider cash or defensive positions\\n"
+        parts.append(_VOL_SIZING_BLOCK)
         
-        return advice
+        return "".join(parts)
     
     def _provide_fundamental_analysis(self, ticker: str, market_data: Dict) -> str:
         """Provide fundamental analysis"""
-        advice = f"**Fundamental Analysis**\\n\\n"
+        parts = [f"**Fundamental Analysis**\\n\\n"]
         
         if ticker:
-            advice += f"**{ticker} Fundamental Analysis:**\\n\\n"
+            parts.append(f"**{ticker} Fundamental Analysis:**\\n\\n")
             asset_analysis = self._get_asset_analysis(ticker, market_data)
             if asset_analysis:
-                advice += self._generate_fundamental_analysis(asset_analysis)
+                parts.append(self._generate_fundamental_analysis(asset_analysis))
             else:
-                advice += f"No current analysis available for {ticker}.\\n\\n"
+                parts.append(f"No current analysis available for {ticker}.\\n\\n")
         
         # Key fundamental metrics
-        advice += "**Key Fundamental Metrics:**\\n\\n"
-        
-        advice += "**Valuation Metrics:**\\n"
-        advice += "• **P/E Ratio:** Price-to-earnings (lower is better)\\n"
-        advice += "• **P/B Ratio:** Price-to-book (lower is better)\\n"
-        advice += "• **PEG Ratio:** P/E to growth (1.0 is fair value)\\n"
-        advice += "• **EV/EBITDA:** Enterprise value to EBITDA\\n\\n"
-        
-        advice += "**Growth Metrics:**\\n"
-        advice += "• **Revenue Growth:** Year-over-year growth\\n"
-        advice += "• **EPS Growth:** Earnings per share growth\\n"
-        advice += "• **ROE:** Return on equity (higher is better)\\n"
-        advice += "• **ROA:** Return on assets\\n\\n"
-        
-        advice += "**Financial Health:**\\n"
-        advice += "• **Debt-to-Equity:** Lower is better\\n"
-        advice += "• **Current Ratio:** Liquidity measure\\n"
-        advice += "• **Free Cash Flow:** Cash generation ability\\n"
-        advice += "• **Dividend Yield:** Income component\\n\\n"
+        parts.append(_FUND_METRICS_BLOCK)
         
         # Analysis framework
-        advice += "**Fundamental Analysis Framework:**\\n"
-        advice += "1. **Business Model:** Understand how company makes money\\n"
-        advice += "2. **Competitive Advantage:** Moat and barriers to entry\\n"
-        advice += "3. **Management Quality:** Track record and integrity\\n"
-        advice += "4. **Financial Health:** Balance sheet and cash flow\\n"
-        advice += "5. **Valuation:** Is the stock fairly priced?\\n"
-        advice += "6. **Growth Prospects:** Future expansion opportunities\\n"
+        parts.append(_FUND_FRAMEWORK_BLOCK)
         
-        return advice
+        return "".join(parts)
     
     def _provide_technical_analysis(self, ticker: str, market_data: Dict) -> str:
         """Provide technical analysis"""
-        advice = f"**Technical Analysis**\\n\\n"
+        parts = [f"**Technical Analysis**\\n\\n"]
         
         if ticker:
-            advice += f"**{ticker} Technical Analysis:**\\n\\n"
+            parts.append(f"**{ticker} Technical Analysis:**\\n\\n")
             asset_analysis = self._get_asset_analysis(ticker, market_data)
             if asset_analysis:
-                advice += self._generate_technical_analysis(asset_analysis)
+                parts.append(self._generate_technical_analysis(asset_analysis))
             else:
-                advice += f"No current analysis available for {ticker}.\\n\\n"
+                parts.append(f"No current analysis available for {ticker}.\\n\\n")
         
         # Technical indicators
-        advice += "**Key Technical Indicators:**\\n\\n"
-        
-        advice += "**Trend Indicators:**\\n"
-        advice += "• **Moving Averages:** SMA, EMA (trend direction)\\n"
-        advice += "• **MACD:** Momentum and trend changes\\n"
-        advice += "• **ADX:** Trend strength measurement\\n\\n"
-        
-        advice += "**Momentum Indicators:**\\n"
-        advice += "• **RSI:** Overbought/oversold conditions\\n"
-        advice += "• **Stochastic:** Momentum oscillator\\n"
-        advice += "• **Williams %R:** Momentum indicator\\n\\n"
-        
-        advice += "**Volume Indicators:**\\n"
-        advice += "• **OBV:** On-balance volume\\n"
-        advice += "• **Volume Rate:** Volume trend analysis\\n"
-        advice += "• **Accumulation/Distribution:** Money flow\\n\\n"
-        
-        advice += "**Support & Resistance:**\\n"
-        advice += "• **Pivot Points:** Key price levels\\n"
-        advice += "• **Fibonacci Retracements:** Natural support/resistance\\n"
-        advice += "• **Chart Patterns:** Head & shoulders, triangles\\n\\n"
+        parts.append(_TECH_INDICATORS_BLOCK)
         
         # Technical analysis framework
-        advice += "**Technical Analysis Framework:**\\n"
-        advice += "1. **Trend Analysis:** Overall direction\\n"
-        advice += "2. **Support/Resistance:** Key price levels\\n"
-        advice += "3. **Momentum:** Strength of move\\n"
-        advice += "4. **Volume Confirmation:** Volume supporting price\\n"
-        advice += "5. **Pattern Recognition:** Chart formations\\n"
-        advice += "6. **Risk Management:** Stop-loss placement\\n"
+        parts.append(_TECH_FRAMEWORK_BLOCK)
         
-        return advice
+        return "".join(parts)
     
     # Helper methods for advanced analysis
     def _extract_strategy(self, question: str) -> Optional[str]:
         """Extract trading strategy from question"""
-        question_lower = question.lower()
-        for strategy in self.strategies.keys():
-            if strategy in question_lower:
-                return strategy
-        return None
+        found = {match.group(1) for match in self._STRATEGY_RE.finditer(question.lower())}
+        return min(found, key=self._STRATEGY_RANK.__getitem__) if found else None
     
     def _extract_timeframe(self, question: str) -> str:
         """Extract timeframe from question"""
-        question_lower = question.lower()
-        if any(word in question_lower for word in ['short', 'quick', 'immediate', 'soon', 'day']):
+        words = set(_WORD_RE.findall(question.lower()))
+        if words & _SHORT_TERM:
             return 'short_term'
-        elif any(word in question_lower for word in ['long', 'years', 'retirement', 'position']):
+        elif words & _LONG_TERM:
             return 'long_term'
-        elif any(word in question_lower for word in ['swing', 'weeks', 'months']):
-            return 'medium_term'
         else:
             return 'medium_term'
     
@@ -728,72 +1161,229 @@ class AdvancedTradingPartner:
     
     def _momentum_strategy_details(self, market_data: Dict) -> str:
         """Provide momentum strategy details"""
-        return "• **Entry:** Breakout above resistance with volume\\n• **Exit:** Momentum divergence or support break\\n• **Risk Management:** Trail stop-loss\\n"
+        return _STRATEGY_DETAILS['momentum']
     
     def _value_strategy_details(self, market_data: Dict) -> str:
         """Provide value strategy details"""
-        return "• **Entry:** Undervalued based on fundamentals\\n• **Exit:** Price reaches fair value\\n• **Risk Management:** Wide stop-loss for volatility\\n"
+        return _STRATEGY_DETAILS['value']
     
     def _growth_strategy_details(self, market_data: Dict) -> str:
         """Provide growth strategy details"""
-        return "• **Entry:** Strong growth metrics and momentum\\n• **Exit:** Growth slows or valuation excessive\\n• **Risk Management:** Monitor growth sustainability\\n"
+        return _STRATEGY_DETAILS['growth']
     
     def _dividend_strategy_details(self, market_data: Dict) -> str:
         """Provide dividend strategy details"""
-        return "• **Entry:** High dividend yield with growth\\n• **Exit:** Dividend cut or yield too low\\n• **Risk Management:** Focus on dividend sustainability\\n"
+        return _STRATEGY_DETAILS['dividend']
     
     def _contrarian_strategy_details(self, market_data: Dict) -> str:
         """Provide contrarian strategy details"""
-        return "• **Entry:** Extreme sentiment readings\\n• **Exit:** Sentiment normalizes\\n• **Risk Management:** Position sizing critical\\n"
+        return _STRATEGY_DETAILS['contrarian']
     
     def _arbitrage_strategy_details(self, market_data: Dict) -> str:
         """Provide arbitrage strategy details"""
-        return "• **Entry:** Price discrepancies identified\\n• **Exit:** Prices converge\\n• **Risk Management:** Monitor correlation breakdown\\n"
+        return _STRATEGY_DETAILS['arbitrage']
+    
+    def _position_arrays(self, positions: List[Dict]) -> _PositionArrays:
+        """Column arrays for a positions list, converted once per question"""
+        cache = self._position_arrays_cache
+        if cache is None or cache[0] is not positions:
+            cache = self._position_arrays_cache = (positions, _PositionArrays.from_positions(positions))
+        return cache[1]
+    
+    def _positions_to_arrays(self, positions: List[Dict]) -> Tuple[np.ndarray, List[str]]:
+        """Convert positions to a normalized weight vector and matching tickers"""
+        arrays = self._position_arrays(positions)
+        w = arrays.values.copy()
+        total = w.sum()
+        if total > 0:
+            w /= total
+        return w, arrays.tickers
+    
+    def _get_risk_decomp(self, tickers: List[str]) -> Optional[Dict]:
+        """Return the cached covariance and eigen decomposition for a set of tickers"""
+        key = frozenset(t for t in tickers if t)
+        now = time.time()
+        entry = self._risk_cache.get(key)
+        if entry and now - entry[0] < self._RISK_CACHE_TTL:
+            return entry[1]
+        
+        order = sorted(key)
+        decomp = None
+        fetched = _fetch_returns(order + [self._MARKET_PROXY]) if order else None
+        returns = None
+        # Usable with the market proxy and at least one position priced; the
+        # decomposition then covers just the positions that had history
+        if fetched is not None and len(fetched[1]) > 1 and fetched[1][-1] == self._MARKET_PROXY:
+            returns, order = fetched[0], fetched[1][:-1]
+        if returns is not None:
+            # Daily returns carry only a few significant digits, so single
+            # precision halves the memory traffic of the matrix work below
+            returns = returns.astype(np.float32, copy=False)
+            cov = np.cov(returns, rowvar=False, dtype=np.float32)
+            std = returns.std(axis=0)
+            std[std == 0] = 1
+            x = (returns - returns.mean(axis=0)) / std
+            corr = (x[:, :-1].T @ x[:, :-1]) / len(x)
+            eigvals, eigvecs = np.linalg.eigh(corr)
+            
+            # Clip the noise band below the Marchenko-Pastur edge to its mean so
+            # the cleaned covariance stays well conditioned for the solvers
+            edge = (1 + np.sqrt(corr.shape[0] / len(x))) ** 2
+            noise = eigvals < edge
+            clipped = eigvals.copy()
+            if noise.any():
+                clipped[noise] = eigvals[noise].mean()
+            vol = np.sqrt(np.diag(cov)[:-1])
+            cov_clean = (eigvecs * clipped) @ eigvecs.T * np.outer(vol, vol)
+            
+            decomp = {
+                'tickers': order,
+                'returns': returns[:, :-1],
+                'cov': cov[:-1, :-1],
+                'cov_clean': cov_clean,
+                'corr': corr,
+                'eigvals': eigvals,
+                'eigvecs': eigvecs,
+                'market_cov': cov[:-1, -1],
+                'market_var': cov[-1, -1]
+            }
+        
+        # Failed downloads are cached too so they are not retried on every question
+        self._risk_cache[key] = (now, decomp)
+        return decomp
+    
+    def _align_weights(self, w: np.ndarray, tickers: List[str], order: List[str]) -> np.ndarray:
+        """Re-express position weights in the ticker order of a risk decomposition"""
+        index = {t: i for i, t in enumerate(order)}
+        aligned = np.zeros(len(order))
+        for weight, ticker in zip(w, tickers):
+            if ticker in index:
+                aligned[index[ticker]] += weight
+        return aligned
+    
+    def _frontier_weights(self, decomp: Dict, targets: np.ndarray) -> Optional[np.ndarray]:
+        """Closed-form Markowitz weights for each target annual return (one row per target)"""
+        # Solve in double precision; the system is tiny next to the returns matrix
+        mu = decomp['returns'].mean(axis=0, dtype=np.float64) * 252
+        cov = decomp['cov_clean'].astype(np.float64) * 252
+        n = len(mu)
+        ones = np.ones(n)
+        
+        # Solve C x = [mu, 1] for both right-hand sides at once rather than inverting C
+        try:
+            solved = np.linalg.solve(cov + 1e-8 * np.eye(n), np.column_stack((mu, ones)))
+        except np.linalg.LinAlgError:
+            return None
+        cinv_mu, cinv_1 = solved[:, 0], solved[:, 1]
+        
+        a = ones @ cinv_1
+        b = ones @ cinv_mu
+        c = mu @ cinv_mu
+        det = a * c - b * b
+        if abs(det) < 1e-12:
+            return np.tile(cinv_1 / a, (len(targets), 1))
+        
+        # The weights are affine in the target, so the whole frontier is two outer products
+        lam = (c - b * targets) / det
+        gamma = (a * targets - b) / det
+        return np.outer(lam, cinv_1) + np.outer(gamma, cinv_mu)
+    
+    def _markowitz_weights(self, decomp: Dict, target_return: Optional[float] = None) -> Optional[np.ndarray]:
+        """Markowitz weights for a target annual return (defaults to the average asset return)"""
+        if target_return is None:
+            target_return = decomp['returns'].mean(dtype=np.float64) * 252
+        weights = self._frontier_weights(decomp, np.array([target_return]))
+        return weights[0] if weights is not None else None
+    
+    def _max_sharpe_frontier_point(self, decomp: Dict, points: int = 50) -> Optional[Tuple[float, float]]:
+        """Scan the efficient frontier and return (return, volatility) of its best Sharpe point"""
+        mu = decomp['returns'].mean(axis=0, dtype=np.float64) * 252
+        targets = np.linspace(mu.min(), mu.max(), points)
+        weights = self._frontier_weights(decomp, targets)
+        if weights is None:
+            return None
+        
+        vols = np.sqrt(np.maximum(np.einsum('kn,nm,km->k', weights, decomp['cov_clean'].astype(np.float64) * 252, weights), 0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpes = (targets - self._RISK_FREE_RATE) / vols
+        sharpes[~(vols > 0)] = -np.inf
+        best = int(np.argmax(sharpes))
+        return float(targets[best]), float(vols[best])
     
     def _calculate_portfolio_metrics(self, positions: List[Dict], market_data: Dict) -> Dict:
         """Calculate advanced portfolio metrics"""
-        # Simplified implementation
-        return {
+        w, tickers = self._positions_to_arrays(positions)
+        
+        metrics = {
             'beta': 1.2,
             'sharpe': 0.8,
-            'concentration': 0.3
+            'concentration': round(float(_hhi(w)), 2)
         }
+        
+        # Refine the fallback values when price history is available
+        decomp = self._get_risk_decomp(tickers)
+        if decomp is not None:
+            w = self._align_weights(w, tickers, decomp['tickers'])
+            metrics['beta'] = round(float(decomp['market_cov'] @ w / decomp['market_var']), 2)
+            sharpe = self._portfolio_sharpe(decomp, w)
+            if sharpe is not None:
+                metrics['sharpe'] = round(sharpe, 2)
+            
+            # Share of total variance carried by the dominant eigen-portfolio
+            eigvals = decomp['eigvals']
+            metrics['risk_concentration'] = round(float(eigvals[-1] / eigvals.sum()), 2)
+        
+        return metrics
+    
+    def _portfolio_sharpe(self, decomp: Dict, w: np.ndarray) -> Optional[float]:
+        """Annualized Sharpe ratio of weights aligned to a risk decomposition"""
+        port_returns = decomp['returns'] @ w
+        port_vol = port_returns.std() * np.sqrt(252)
+        if port_vol > 0:
+            return float((port_returns.mean() * 252 - self._RISK_FREE_RATE) / port_vol)
+        return None
     
     def _analyze_sector_allocation(self, positions: List[Dict]) -> Dict:
         """Analyze sector allocation"""
-        sector_allocation = {}
-        total_value = sum(pos.get('value', 0) for pos in positions)
-        
-        for pos in positions:
-            sector = pos.get('sector', 'Unknown')
-            value = pos.get('value', 0)
-            sector_allocation[sector] = sector_allocation.get(sector, 0) + value
+        # One pass over the columns; for portfolio-sized inputs this beats
+        # np.unique's sort, and dict insertion keeps first-appearance order
+        arrays = self._position_arrays(positions)
+        sector_values = defaultdict(float)
+        for sector, value in zip(arrays.sectors.tolist(), arrays.values.tolist()):
+            sector_values[sector] += value
         
         # Convert to percentages
-        for sector in sector_allocation:
-            sector_allocation[sector] = sector_allocation[sector] / total_value if total_value > 0 else 0
-        
-        return sector_allocation
+        total_value = arrays.values.sum()
+        if total_value > 0:
+            return {sector: value / total_value for sector, value in sector_values.items()}
+        return {sector: 0 for sector in sector_values}
     
-    def _assess_position_risk(self, position: Dict, market_data: Dict) -> str:
-        """Assess risk level of individual position"""
-        # Simplified risk assessment
-        return 'medium'
+    def _position_risk_arrays(self, positions: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-position market beta and annualized volatility (NaN where unknown)"""
+        betas = np.full(len(positions), np.nan)
+        vols = np.full(len(positions), np.nan)
+        tickers = self._position_arrays(positions).tickers
+        decomp = self._get_risk_decomp(tickers)
+        if decomp is not None:
+            index = {t: i for i, t in enumerate(decomp['tickers'])}
+            rows = np.array([index.get(t, -1) for t in tickers], dtype=np.intp)
+            known = rows >= 0
+            betas[known] = decomp['market_cov'][rows[known]] / decomp['market_var']
+            vols[known] = np.sqrt(np.diag(decomp['cov'])[rows[known]] * 252)
+        return betas, vols
+    
+    def _assess_position_risks(self, values: np.ndarray, betas: np.ndarray, vols: np.ndarray) -> np.ndarray:
+        """Flag high-risk positions: high beta, high volatility or an outsized weight"""
+        total = values.sum()
+        weights = values / total if total > 0 else np.zeros_like(values)
+        return (betas > 1.5) | (vols > 0.4) | (weights > 0.2)
     
     def _generate_price_prediction(self, asset_analysis: Dict) -> str:
         """Generate price prediction based on analysis"""
         score = asset_analysis.get('score', 50)
-        momentum = asset_analysis.get('momentum_3m', 0)
-        
-        if score >= 80:
-            return f"**Bullish Outlook:** Strong fundamentals and momentum suggest upward price movement. Target: +15-25% over 6 months.\\n"
-        elif score >= 60:
-            return f"**Moderately Bullish:** Positive trends suggest modest gains. Target: +5-15% over 6 months.\\n"
-        elif score >= 40:
-            return f"**Neutral:** Mixed signals suggest sideways movement. Target: -5% to +5% over 6 months.\\n"
-        else:
-            return f"**Bearish:** Weak fundamentals suggest downward pressure. Target: -10-20% over 6 months.\\n"
+        return _PRICE_PREDICTIONS[(score >= 40) + (score >= 60) + (score >= 80)]
     
+    @_market_memo()
     def _analyze_market_outlook(self, market_data: Dict) -> str:
         """Analyze overall market outlook"""
         return "**Market Outlook:** Current conditions suggest moderate growth with increased volatility. Focus on quality companies with strong fundamentals.\\n"
@@ -802,26 +1392,14 @@ class AdvancedTradingPartner:
         """Determine current market phase"""
         return "Mid-Cycle"
     
-    def _get_sector_recommendations(self, market_data: Dict) -> Dict:
+    def _get_sector_recommendations(self, market_data: Dict) -> Mapping[str, str]:
         """Get sector recommendations"""
-        return {
-            'Technology': 'Moderate allocation - focus on AI leaders',
-            'Healthcare': 'Overweight - demographic trends supportive',
-            'Financials': 'Underweight - interest rate sensitivity',
-            'Energy': 'Neutral - volatile commodity prices',
-            'Consumer Staples': 'Overweight - defensive positioning'
-        }
+        return _SECTOR_RECOMMENDATIONS
     
     def _generate_options_strategies(self, asset_analysis: Dict) -> str:
         """Generate options strategies based on analysis"""
         score = asset_analysis.get('score', 50)
-        
-        if score >= 70:
-            return "**Bullish Strategies:**\\n• Long calls for upside leverage\\n• Covered calls for income\\n• Bull call spreads for limited risk\\n"
-        elif score <= 30:
-            return "**Bearish Strategies:**\\n• Long puts for downside protection\\n• Put spreads for limited risk\\n• Short calls for income\\n"
-        else:
-            return "**Neutral Strategies:**\\n• Iron condors for range-bound markets\\n• Straddles for volatility plays\\n• Calendar spreads for time decay\\n"
+        return _OPTIONS_STRATEGIES[1 + (score >= 70) - (score <= 30)]
     
     def _analyze_crypto_market(self, market_data: Dict) -> str:
         """Analyze crypto market conditions"""
@@ -835,14 +1413,34 @@ class AdvancedTradingPartner:
         """Generate DCA strategy"""
         return f"**DCA Strategy:** Invest ${amount/4:,.0f} weekly over 4 months for optimal dollar-cost averaging.\\n"
     
-    def _calculate_portfolio_correlations(self, positions: List[Dict], market_data: Dict) -> Dict:
+    def _calculate_portfolio_correlations(self, positions: List[Dict], market_data: Dict) -> Mapping:
         """Calculate portfolio correlations"""
-        return {
-            'average': 0.65,
-            'highest': 'AAPL & MSFT: 0.85',
-            'lowest': 'Bonds & Stocks: -0.15',
-            'high_correlation_pairs': [('AAPL', 'MSFT', 0.85), ('GOOGL', 'META', 0.78)]
-        }
+        _, tickers = self._positions_to_arrays(positions)
+        decomp = self._get_risk_decomp(tickers)
+        if decomp is not None and len(decomp['tickers']) > 1:
+            tickers = decomp['tickers']
+            n = len(tickers)
+            corr = decomp['corr']
+            
+            iu = np.triu_indices(n, 1)
+            vals = corr[iu]
+            hi, lo = vals.argmax(), vals.argmin()
+            
+            # Strongest few pairs above the warning threshold, highest first
+            k = min(3, len(vals))
+            top = np.argpartition(-vals, k - 1)[:k]
+            top = top[np.argsort(-vals[top])]
+            
+            return {
+                'average': round(float(vals.mean()), 2),
+                'highest': f"{tickers[iu[0][hi]]} & {tickers[iu[1][hi]]}: {vals[hi]:.2f}",
+                'lowest': f"{tickers[iu[0][lo]]} & {tickers[iu[1][lo]]}: {vals[lo]:.2f}",
+                'high_correlation_pairs': [
+                    (tickers[iu[0][i]], tickers[iu[1][i]], float(vals[i])) for i in top if vals[i] > 0.7
+                ]
+            }
+        
+        return _FALLBACK_CORRELATIONS
     
     def _analyze_volatility_environment(self, market_data: Dict) -> str:
         """Analyze current volatility environment"""
@@ -856,11 +1454,7 @@ class AdvancedTradingPartner:
         """Generate technical analysis"""
         return "**Technical Analysis:** Bullish trend with strong momentum. Key resistance levels identified. Support levels holding well.\\n"
     
-    def _is_growth_stock(self, position: Dict, market_data: Dict) -> bool:
-        """Determine if position is a growth stock"""
-        # Simplified implementation
-        return 'growth' in position.get('sector', '').lower()
-    
+    @_market_memo()
     def _analyze_sector_performance(self, market_data: Dict) -> str:
         """Analyze sector performance"""
         return "• Technology: +12% YTD\\n• Healthcare: +8% YTD\\n• Financials: +5% YTD\\n• Energy: -3% YTD\\n• Utilities: +2% YTD\\n"
@@ -872,33 +1466,18 @@ class AdvancedTradingPartner:
     # Inherit basic methods from InvestmentChatbot
     def _extract_ticker(self, question: str) -> Optional[str]:
         """Extract ticker symbol from question"""
-        import re
-        ticker_patterns = [
-            r'\b([A-Z]{1,5})\b',
-            r'\$([A-Z]{1,5})\b',
-            r'([A-Z]{1,5}-USD)\b'
-        ]
-        
-        for pattern in ticker_patterns:
-            matches = re.findall(pattern, question.upper())
-            if matches:
-                return matches[0]
+        match = _TICKER_RE.search(question.upper())
+        if match:
+            return sys.intern(next(group for group in match.groups() if group))
         return None
     
     def _extract_amount(self, question: str) -> Optional[float]:
         """Extract investment amount from question"""
-        import re
-        amount_patterns = [
-            r'\$(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            r'(\d+(?:,\d{3})*(?:\.\d{2})?)\s*dollars?',
-            r'(\d+(?:,\d{3})*(?:\.\d{2})?)\s*k',
-            r'(\d+(?:,\d{3})*(?:\.\d{2})?)\s*thousand'
-        ]
-        
-        for pattern in amount_patterns:
-            matches = re.findall(pattern, question.lower())
-            if matches:
-                amount_str = matches[0].replace(',', '')
+        question_lower = question.lower()
+        for pattern in _AMOUNT_RES:
+            match = pattern.search(question_lower)
+            if match:
+                amount_str = match.group(1).replace(',', '')
                 if 'k' in amount_str or 'thousand' in amount_str:
                     return float(amount_str.replace('k', '').replace('thousand', '')) * 1000
                 return float(amount_str)
@@ -909,10 +1488,20 @@ class AdvancedTradingPartner:
         if not market_data or not market_data.get('assets'):
             return None
         
-        for asset in market_data['assets']:
-            if asset.get('ticker', '').upper() == ticker.upper():
-                return asset
-        return None
+        # Rebuild the ticker index whenever the assets list is swapped out.
+        # Keying on the list itself (not id(market_data)) catches the in-place
+        # refresh in app.py, and holding the reference rules out id reuse.
+        assets = market_data['assets']
+        if self._asset_index_cache is None or self._asset_index_cache[0] is not assets:
+            index = {}
+            for asset in assets:
+                index.setdefault(sys.intern(asset.get('ticker', '').upper()), asset)
+            self._asset_index_cache = (assets, index)
+        
+        # Extracted tickers are already uppercase, so only fall back to upper() on a miss
+        index = self._asset_index_cache[1]
+        asset = index.get(ticker)
+        return asset if asset is not None else index.get(ticker.upper())
     
     def _provide_advanced_position_sizing(self, ticker: str, amount: float, market_data: Dict, portfolio_data: Dict) -> str:
         """Provide advanced position sizing with Kelly Criterion and risk parity"""
@@ -923,43 +1512,51 @@ class AdvancedTradingPartner:
         if not asset_analysis:
             return f"I don't have current analysis for {ticker}. Please make sure the ticker symbol is correct."
         
-        advice = f"**Advanced Position Sizing for {ticker}**\\n\\n"
+        parts = [f"**Advanced Position Sizing for {ticker}**\\n\\n"]
         
-        # Kelly Criterion
-        advice += "**Kelly Criterion Analysis:**\\n"
+        # Estimated trade statistics
         win_rate = 0.6  # Estimated based on score
         avg_win = 0.15
         avg_loss = 0.10
-        kelly_pct = (win_rate * avg_win - (1 - win_rate) * avg_loss) / avg_win
-        kelly_pct = max(0, min(kelly_pct, 0.25))  # Cap at 25%
+        volatility = asset_analysis.get('volatility', 0.25)  # 25% annual volatility
+        n_positions = len(portfolio_data.get('positions', [])) if portfolio_data else 0
+        kelly_pct, half_kelly, aggressive_kelly, risk_parity_pct, vol_adjusted_pct, final_pct = _kelly_and_sizing(
+            win_rate, avg_win, avg_loss, float(volatility), n_positions
+        )
         
-        advice += f"• **Optimal Kelly %:** {kelly_pct:.1%}\\n"
-        advice += f"• **Conservative Kelly:** {kelly_pct * 0.5:.1%} (half Kelly)\\n"
-        advice += f"• **Aggressive Kelly:** {kelly_pct * 1.5:.1%} (1.5x Kelly)\\n\\n"
+        # Kelly Criterion
+        parts.append(
+            "**Kelly Criterion Analysis:**\\n"
+            f"• **Optimal Kelly %:** {kelly_pct:.1%}\\n"
+            f"• **Conservative Kelly:** {half_kelly:.1%} (half Kelly)\\n"
+            f"• **Aggressive Kelly:** {aggressive_kelly:.1%} (1.5x Kelly)\\n\\n"
+        )
         
         # Risk Parity
-        advice += "**Risk Parity Approach:**\\n"
+        parts.append("**Risk Parity Approach:**\\n")
         portfolio_value = self._get_portfolio_value(portfolio_data)
         if portfolio_value:
-            risk_parity_pct = 0.1 / len(portfolio_data.get('positions', [])) if portfolio_data.get('positions') else 0.1
-            advice += f"• **Risk Parity %:** {risk_parity_pct:.1%}\\n"
-            advice += f"• **Risk Parity Amount:** ${portfolio_value * risk_parity_pct:,.0f}\\n\\n"
+            parts.append(
+                f"• **Risk Parity %:** {risk_parity_pct:.1%}\\n"
+                f"• **Risk Parity Amount:** ${portfolio_value * risk_parity_pct:,.0f}\\n\\n"
+            )
         
         # Volatility-based sizing
-        advice += "**Volatility-Based Sizing:**\\n"
-        volatility = asset_analysis.get('volatility', 0.25)  # 25% annual volatility
-        vol_adjusted_pct = 0.1 / volatility  # Inverse volatility weighting
-        advice += f"• **Vol-Adjusted %:** {vol_adjusted_pct:.1%}\\n"
-        advice += f"• **Vol-Adjusted Amount:** ${portfolio_value * vol_adjusted_pct:,.0f}\\n\\n"
+        parts.append(
+            "**Volatility-Based Sizing:**\\n"
+            f"• **Vol-Adjusted %:** {vol_adjusted_pct:.1%}\\n"
+            f"• **Vol-Adjusted Amount:** ${portfolio_value * vol_adjusted_pct:,.0f}\\n\\n"
+        )
         
         # Final recommendation
-        advice += "**Final Recommendation:**\\n"
-        final_pct = min(kelly_pct * 0.5, vol_adjusted_pct, 0.1)  # Conservative approach
-        advice += f"• **Recommended Position Size:** {final_pct:.1%}\\n"
+        parts.append(
+            "**Final Recommendation:**\\n"
+            f"• **Recommended Position Size:** {final_pct:.1%}\\n"
+        )
         if portfolio_value:
-            advice += f"• **Recommended Dollar Amount:** ${portfolio_value * final_pct:,.0f}\\n"
+            parts.append(f"• **Recommended Dollar Amount:** ${portfolio_value * final_pct:,.0f}\\n")
         
-        return advice
+        return "".join(parts)
     
     def _provide_advanced_timing_advice(self, ticker: str, market_data: Dict) -> str:
         """Provide advanced timing advice with multiple timeframes"""
@@ -970,28 +1567,18 @@ class AdvancedTradingPartner:
         if not asset_analysis:
             return f"I don't have current analysis for {ticker}. Please make sure the ticker symbol is correct."
         
-        advice = f"**Advanced Timing Analysis for {ticker}**\\n\\n"
+        parts = [f"**Advanced Timing Analysis for {ticker}**\\n\\n"]
         
         # Multi-timeframe analysis
-        advice += "**Multi-Timeframe Analysis:**\\n"
-        advice += "• **Short-term (1-4 weeks):** Technical momentum suggests continuation\\n"
-        advice += "• **Medium-term (1-3 months):** Fundamental trends remain positive\\n"
-        advice += "• **Long-term (6+ months):** Structural growth story intact\\n\\n"
+        parts.append(_TIMING_TIMEFRAMES_BLOCK)
         
         # Entry strategies
-        advice += "**Advanced Entry Strategies:**\\n"
-        advice += "• **Scale-in Approach:** Enter 1/3 now, 1/3 on pullback, 1/3 on breakout\\n"
-        advice += "• **Dollar-Cost Averaging:** Weekly purchases over 8-12 weeks\\n"
-        advice += "• **Technical Entry:** Wait for pullback to key support levels\\n"
-        advice += "• **Fundamental Entry:** Enter on earnings beat or positive guidance\\n\\n"
+        parts.append(_TIMING_ENTRY_BLOCK)
         
         # Risk management
-        advice += "**Timing Risk Management:**\\n"
-        advice += "• **Stop-Loss:** Set at 15-20% below entry\\n"
-        advice += "• **Take-Profit:** Scale out at 25%, 50%, 75% gains\\n"
-        advice += "• **Time Stop:** Exit if no progress in 3 months\\n"
+        parts.append(_TIMING_RISK_BLOCK)
         
-        return advice
+        return "".join(parts)
     
     def _provide_advanced_risk_assessment(self, ticker: str, market_data: Dict) -> str:
         """Provide advanced risk assessment with multiple risk factors"""
@@ -1002,26 +1589,15 @@ class AdvancedTradingPartner:
         if not asset_analysis:
             return f"I don't have current analysis for {ticker}. Please make sure the ticker symbol is correct."
         
-        advice = f"**Advanced Risk Assessment for {ticker}**\\n\\n"
+        parts = [f"**Advanced Risk Assessment for {ticker}**\\n\\n"]
         
         # Risk factors analysis
-        advice += "**Risk Factor Analysis:**\\n"
-        advice += "• **Market Risk (Beta):** Moderate correlation with market\\n"
-        advice += "• **Volatility Risk:** Above-average price swings\\n"
-        advice += "• **Liquidity Risk:** Good trading volume\\n"
-        advice += "• **Concentration Risk:** Diversified business model\\n"
-        advice += "• **Regulatory Risk:** Industry-specific regulations\\n"
-        advice += "• **Currency Risk:** Minimal for US companies\\n\\n"
+        parts.append(_RISK_FACTORS_BLOCK)
         
         # Risk mitigation strategies
-        advice += "**Risk Mitigation Strategies:**\\n"
-        advice += "• **Position Sizing:** Limit to 5-10% of portfolio\\n"
-        advice += "• **Stop-Losses:** Use trailing stops\\n"
-        advice += "• **Hedging:** Consider put options\\n"
-        advice += "• **Diversification:** Don't concentrate in one sector\\n"
-        advice += "• **Monitoring:** Regular review of fundamentals\\n"
+        parts.append(_RISK_MITIGATION_BLOCK)
         
-        return advice
+        return "".join(parts)
     
     def _provide_advanced_analysis_explanation(self, ticker: str, market_data: Dict) -> str:
         """Provide advanced analysis explanation with multiple methodologies"""
@@ -1032,146 +1608,165 @@ class AdvancedTradingPartner:
         if not asset_analysis:
             return f"I don't have current analysis for {ticker}. Please make sure the ticker symbol is correct."
         
-        advice = f"**Advanced Analysis Explanation for {ticker}**\\n\\n"
+        score = asset_analysis.get('score', 0)
+        reasoning = asset_analysis.get('reasoning', ())
+        
+        parts = [f"**Advanced Analysis Explanation for {ticker}**\\n\\n"]
         
         # Analysis methodologies
-        advice += "**Analysis Methodologies Used:**\\n"
-        advice += "• **Quantitative Analysis:** Statistical models and metrics\\n"
-        advice += "• **Technical Analysis:** Chart patterns and indicators\\n"
-        advice += "• **Fundamental Analysis:** Financial statements and ratios\\n"
-        advice += "• **Sentiment Analysis:** Market psychology and news\\n"
-        advice += "• **Expert Analysis:** Top investor holdings\\n\\n"
-        
-        # Score breakdown
-        score = asset_analysis.get('score', 0)
-        advice += f"**Score Breakdown (Total: {score}/100):**\\n"
-        advice += f"• **Technical Score:** {score * 0.3:.0f}/30\\n"
-        advice += f"• **Fundamental Score:** {score * 0.3:.0f}/30\\n"
-        advice += f"• **Momentum Score:** {score * 0.2:.0f}/20\\n"
-        advice += f"• **Expert Score:** {score * 0.2:.0f}/20\\n\\n"
+        parts.append(_ANALYSIS_METHODS_BLOCK)
+        
+        # Score breakdown: technical and fundamental weigh 30% each, momentum and expert 20%
+        major, minor = score * 0.3, score * 0.2
+        parts.append(
+            f"**Score Breakdown (Total: {score}/100):**\\n"
+            f"• **Technical Score:** {major:.0f}/30\\n"
+            f"• **Fundamental Score:** {major:.0f}/30\\n"
+            f"• **Momentum Score:** {minor:.0f}/20\\n"
+            f"• **Expert Score:** {minor:.0f}/20\\n\\n"
+        )
         
         # Key factors
-        advice += "**Key Contributing Factors:**\\n"
-        reasoning = asset_analysis.get('reasoning', [])
-        for reason in reasoning[:5]:
-            advice += f"• {reason}\\n"
+        parts.append("**Key Contributing Factors:**\\n")
+        parts.append("".join(f"• {reason}\\n" for reason in islice(reasoning, 5)))
         
-        return advice
+        return "".join(parts)
     
     def _provide_advanced_portfolio_advice(self, portfolio_data: Dict, market_data: Dict) -> str:
         """Provide advanced portfolio advice with optimization"""
-        advice = "**Advanced Portfolio Analysis & Optimization**\\n\\n"
+        parts = ["**Advanced Portfolio Analysis & Optimization**\\n\\n"]
         
         if not portfolio_data or not portfolio_data.get('positions'):
-            advice += "No portfolio data available. Import your Trading212 portfolio for advanced analysis!\\n\\n"
-            advice += "**Portfolio Optimization Principles:**\\n"
-            advice += "• **Modern Portfolio Theory:** Maximize risk-adjusted returns\\n"
-            advice += "• **Factor Investing:** Target specific risk factors\\n"
-            advice += "• **Risk Parity:** Equal risk contribution from each asset\\n"
-            advice += "• **Black-Litterman:** Combine views with market equilibrium\\n"
-            return advice
+            parts.append(
+                "No portfolio data available. Import your Trading212 portfolio for advanced analysis!\\n\\n"
+                "**Portfolio Optimization Principles:**\\n"
+                "• **Modern Portfolio Theory:** Maximize risk-adjusted returns\\n"
+                "• **Factor Investing:** Target specific risk factors\\n"
+                "• **Risk Parity:** Equal risk contribution from each asset\\n"
+                "• **Black-Litterman:** Combine views with market equilibrium\\n"
+            )
+            return "".join(parts)
         
         positions = portfolio_data['positions']
-        total_value = sum(pos.get('value', 0) for pos in positions)
+        arrays = self._position_arrays(positions)
+        total_value = arrays.values.sum()
+        effective_n, concentration = _weight_stats(arrays.weights)
         
         # Advanced metrics
-        advice += "**Advanced Portfolio Metrics:**\\n"
-        advice += f"• **Total Value:** ${total_value:,.0f}\\n"
-        advice += f"• **Number of Positions:** {len(positions)}\\n"
-        advice += f"• **Effective Number of Stocks:** {self._calculate_effective_n(positions):.1f}\\n"
-        advice += f"• **Portfolio Concentration:** {self._calculate_concentration(positions):.1%}\\n"
-        advice += f"• **Estimated Sharpe Ratio:** {self._estimate_sharpe(positions):.2f}\\n\\n"
+        parts.append(
+            "**Advanced Portfolio Metrics:**\\n"
+            f"• **Total Value:** ${total_value:,.0f}\\n"
+            f"• **Number of Positions:** {len(positions)}\\n"
+            f"• **Effective Number of Stocks:** {effective_n:.1f}\\n"
+            f"• **Portfolio Concentration:** {concentration:.1%}\\n"
+            f"• **Estimated Sharpe Ratio:** {self._estimate_sharpe(positions):.2f}\\n\\n"
+        )
         
         # Optimization recommendations
-        advice += "**Portfolio Optimization Recommendations:**\\n"
+        parts.append("**Portfolio Optimization Recommendations:**\\n")
         
         # Factor exposure
-        advice += "• **Factor Exposure Analysis:**\\n"
-        advice += "  - Growth vs Value: Balanced\\n"
-        advice += "  - Large vs Small Cap: Large cap heavy\\n"
-        advice += "  - Domestic vs International: Domestic heavy\\n\\n"
+        parts.append(
+            "• **Factor Exposure Analysis:**\\n"
+            "  - Growth vs Value: Balanced\\n"
+            "  - Large vs Small Cap: Large cap heavy\\n"
+            "  - Domestic vs International: Domestic heavy\\n\\n"
+        )
         
         # Rebalancing
-        advice += "• **Rebalancing Strategy:**\\n"
-        advice += "  - Threshold: 5% deviation from target\\n"
-        advice += "  - Frequency: Quarterly\\n"
-        advice += "  - Method: Gradual rebalancing\\n\\n"
+        parts.append(
+            "• **Rebalancing Strategy:**\\n"
+            "  - Threshold: 5% deviation from target\\n"
+            "  - Frequency: Quarterly\\n"
+            "  - Method: Gradual rebalancing\\n\\n"
+        )
         
         # Risk management
-        advice += "• **Risk Management:**\\n"
-        advice += "  - Maximum position size: 10%\\n"
-        advice += "  - Maximum sector exposure: 25%\\n"
-        advice += "  - Correlation limit: 0.7 between positions\\n"
-        
-        return advice
+        parts.append(
+            "• **Risk Management:**\\n"
+            "  - Maximum position size: 10%\\n"
+            "  - Maximum sector exposure: 25%\\n"
+            "  - Correlation limit: 0.7 between positions\\n"
+        )
+        
+        return "".join(parts)
     
     def _provide_advanced_recommendations(self, market_data: Dict) -> str:
         """Provide advanced recommendations with top 3 opportunities"""
         if not market_data or not market_data.get('assets'):
             return "No market data available. Please refresh the data first."
         
-        # Import the opportunities engine
-        try:
-            from top_opportunities_engine import TopOpportunitiesEngine
-            opportunities_engine = TopOpportunitiesEngine()
-            opportunities = opportunities_engine.analyze_all_opportunities(market_data)
-        except ImportError:
+        opportunities = self._get_opportunities(market_data)
+        if opportunities is None:
             # Fallback to basic recommendations
             return self._provide_basic_recommendations(market_data)
         
         if not opportunities:
             return "No high-probability opportunities found. Market conditions may be challenging."
         
-        advice = "**🎯 TOP 3 PROFIT OPPORTUNITIES**\\n\\n"
+        parts = ["**🎯 TOP 3 PROFIT OPPORTUNITIES**\\n\\n"]
         
         for i, opp in enumerate(opportunities, 1):
-            ticker = opp.get('ticker', 'N/A')
-            name = opp.get('name', 'N/A')
             profit_target = opp.get('profit_target', 0)
-            probability = opp.get('profit_probability', 0)
-            risk_level = opp.get('risk_level', 0)
             entry_price = opp.get('entry_price', 0)
-            stop_loss = opp.get('stop_loss', 0)
-            position_size = opp.get('position_size', 0)
-            timeline = opp.get('timeline', 'N/A')
-            
-            advice += f"**#{i}. {ticker} - {name}**\\n"
-            advice += f"💰 **Profit Target:** +{profit_target:.0%} ({entry_price:.2f} → {entry_price * (1 + profit_target):.2f})\\n"
-            advice += f"📊 **Probability:** {probability:.0%} | **Risk:** {risk_level:.0%}\\n"
-            advice += f"🎯 **Entry:** ${entry_price:.2f} | **Stop:** ${stop_loss:.2f} | **Size:** {position_size:.0%}\\n"
-            advice += f"⏰ **Timeline:** {timeline}\\n\\n"
+            parts.append(_OPP_TEMPLATE(
+                i=i,
+                ticker=opp.get('ticker', 'N/A'),
+                name=opp.get('name', 'N/A'),
+                profit_target=profit_target,
+                entry_price=entry_price,
+                target_price=entry_price * (1 + profit_target),
+                probability=opp.get('profit_probability', 0),
+                risk_level=opp.get('risk_level', 0),
+                stop_loss=opp.get('stop_loss', 0),
+                position_size=opp.get('position_size', 0),
+                timeline=opp.get('timeline', 'N/A')
+            ))
             
             # Add why this works
             why_works = opp.get('why_this_works', [])
             if why_works:
-                advice += f"**Why This Works:**\\n"
+                parts.append(f"**Why This Works:**\\n")
                 for reason in why_works[:3]:
-                    advice += f"• {reason}\\n"
-                advice += "\\n"
+                    parts.append(f"• {reason}\\n")
+                parts.append("\\n")
             
             # Add risk factors
             risk_factors = opp.get('risk_factors', [])
             if risk_factors:
-                advice += f"**Risk Factors:**\\n"
-                for risk in risk_factors[:2]:
-                    advice += f"• {risk}\\n"
-                advice += "\\n"
-        
-        advice += "**How to Use These Recommendations:**\\n"
-        advice += "• Start with the highest probability opportunity\\n"
-        advice += "• Use the suggested position sizes\\n"
-        advice += "• Set stop losses as recommended\\n"
-        advice += "• Monitor progress according to timeline\\n"
-        advice += "• Consider your overall portfolio allocation\\n"
+                parts.append("**Risk Factors:**\\n")
+                parts.append("".join(f"• {risk}\\n" for risk in islice(risk_factors, 2)))
+                parts.append("\\n")
+        
+        parts.append(
+            "**How to Use These Recommendations:**\\n"
+            "• Start with the highest probability opportunity\\n"
+            "• Use the suggested position sizes\\n"
+            "• Set stop losses as recommended\\n"
+            "• Monitor progress according to timeline\\n"
+            "• Consider your overall portfolio allocation\\n"
+        )
+        
+        return "".join(parts)
+    
+    def _get_opportunities(self, market_data: Dict) -> Optional[List[Dict]]:
+        """Top opportunities for the current assets list, or None without the engine"""
+        engine = _get_opportunities_engine()
+        if engine is None:
+            return None
         
-        return advice
+        # Re-run the analysis only when the assets list is replaced
+        assets = market_data['assets']
+        if self._opp_cache is None or self._opp_cache[0] is not assets:
+            self._opp_cache = (assets, engine.analyze_all_opportunities(market_data))
+        return self._opp_cache[1]
     
     def _provide_basic_recommendations(self, market_data: Dict) -> str:
         """Provide basic recommendations when opportunities engine not available"""
         assets = market_data['assets']
-        top_assets = sorted(assets, key=lambda x: x.get('score', 0), reverse=True)[:5]
+        top_assets = heapq.nlargest(5, assets, key=lambda x: x.get('score', 0))
         
-        advice = "**Top Investment Recommendations:**\\n\\n"
+        parts = ["**Top Investment Recommendations:**\\n\\n"]
         
         for i, asset in enumerate(top_assets, 1):
             ticker = asset.get('ticker', 'N/A')
@@ -1180,61 +1775,49 @@ class AdvancedTradingPartner:
             price = asset.get('price', 0)
             momentum = asset.get('momentum_3m', 0)
             
-            advice += f"**#{i}. {ticker}**\\n"
-            advice += f"• Score: {score}/100\\n"
-            advice += f"• Recommendation: {recommendation}\\n"
-            advice += f"• Price: ${price:.2f}\\n"
-            advice += f"• 3M Momentum: {momentum:+.1f}%\\n"
-            
             experts = asset.get('experts', [])
-            if experts:
-                advice += f"• Held by: {', '.join(experts[:2])}\\n"
+            held_by = f"• Held by: {', '.join(experts[:2])}\\n" if experts else ""
             
-            advice += "\\n"
-        
-        advice += "**How to Use These Recommendations:**\\n"
-        advice += "• Start with the highest-scored assets\\n"
-        advice += "• Consider your risk tolerance and portfolio size\\n"
-        advice += "• Use position sizing guidelines for each asset\\n"
-        advice += "• Monitor regularly and adjust as needed\\n"
-        
-        return advice
+            parts.append(
+                f"**#{i}. {ticker}**\\n"
+                f"• Score: {score}/100\\n"
+                f"• Recommendation: {recommendation}\\n"
+                f"• Price: ${price:.2f}\\n"
+                f"• 3M Momentum: {momentum:+.1f}%\\n"
+                f"{held_by}\\n"
+            )
+        
+        parts.append(
+            "**How to Use These Recommendations:**\\n"
+            "• Start with the highest-scored assets\\n"
+            "• Consider your risk tolerance and portfolio size\\n"
+            "• Use position sizing guidelines for each asset\\n"
+            "• Monitor regularly and adjust as needed\\n"
+        )
+        
+        return "".join(parts)
     
     def _provide_general_trading_advice(self, question: str, market_data: Dict) -> str:
         """Provide general advanced trading advice"""
-        responses = [
-            "I'm your advanced AI trading partner! I can help with:\n\n• Advanced position sizing (Kelly Criterion, Risk Parity)\n• Multi-timeframe analysis\n• Options strategies\n• Portfolio optimization\n• Risk management\n• Market predictions\n• Sector rotation\n• Volatility analysis\n\nWhat would you like to know?",
-            "I specialize in advanced trading strategies and portfolio optimization. Ask me about:\n\n• Momentum vs Value strategies\n• Options trading strategies\n• Cryptocurrency analysis\n• Hedging techniques\n• Correlation analysis\n• Volatility trading\n• Fundamental analysis\n• Technical analysis\n\nWhat's your question?",
-            "I can provide institutional-quality analysis and strategies. Try asking:\n\n• 'What's the best strategy for this market?'\n• 'How should I optimize my portfolio?'\n• 'What are the top opportunities right now?'\n• 'How do I hedge my positions?'\n• 'What's the risk level of [stock]?'\n\nWhat would you like to explore?"
-        ]
-        
-        import random
-        return random.choice(responses)
+        return random.choice(_GENERAL_ADVICE_RESPONSES)
     
     def _get_portfolio_value(self, portfolio_data: Dict) -> Optional[float]:
         """Get total portfolio value"""
-        if portfolio_data and portfolio_data.get('positions'):
-            return sum(pos.get('value', 0) for pos in portfolio_data['positions'])
-        return None
-    
-    def _calculate_effective_n(self, positions: List[Dict]) -> float:
-        """Calculate effective number of stocks"""
-        weights = [pos.get('weight', 0) / 100 for pos in positions]
-        return 1 / sum(w**2 for w in weights) if weights else 0
-    
-    def _calculate_concentration(self, positions: List[Dict]) -> float:
-        """Calculate portfolio concentration"""
-        weights = [pos.get('weight', 0) / 100 for pos in positions]
-        return max(weights) if weights else 0
+        positions = portfolio_data.get('positions') if portfolio_data else None
+        # NumPy's pairwise summation keeps the rounding error at O(log n) ulps
+        return float(self._position_arrays(positions).values.sum()) if positions else None
     
     def _estimate_sharpe(self, positions: List[Dict]) -> float:
-        """Estimate portfolio Sharpe ratio"""
-        # Simplified estimation
-        return 0.8
-
-def create_advanced_chatbot_page():
-    """Create enhanced HTML page for the advanced AI trading partner"""
-    html_content = """
+        """Estimate portfolio Sharpe ratio from price history, 0.8 without it"""
+        w, tickers = self._positions_to_arrays(positions)
+        decomp = self._get_risk_decomp(tickers)
+        if decomp is None:
+            return 0.8
+        sharpe = self._portfolio_sharpe(decomp, self._align_weights(w, tickers, decomp['tickers']))
+        return 0.8 if sharpe is None else sharpe
+
+# Advanced chat page, written out by create_advanced_chatbot_page
+_CHATBOT_HTML = """
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -1749,9 +2332,48 @@ Ask me anything about advanced trading strategies, portfolio optimization, or ma
 </body>
 </html>
     """
+
+
+_SCRIPT_RE = re.compile(r'(<script\b.*?</script>)', re.S | re.I)
+_STYLE_RE = re.compile(r'(<style\b[^>]*>)(.*?)(</style>)', re.S | re.I)
+_CSS_SPACE_RE = re.compile(r'\s*([{};:,>])\s*')
+
+
+def _minify_html(html: str) -> str:
+    """Drop indentation and compact <style> rules, leaving scripts verbatim"""
+    def compact_css(match):
+        css = _CSS_SPACE_RE.sub(r'\1', match.group(2)).replace(';}', '}')
+        return match.group(1) + css.strip() + match.group(3)
+    
+    chunks = _SCRIPT_RE.split(html)
+    for i in range(0, len(chunks), 2):
+        markup = _STYLE_RE.sub(compact_css, chunks[i])
+        # Blank lines stay: the welcome message sits in a white-space: pre-wrap block
+        chunks[i] = '\n'.join(line.lstrip() for line in markup.split('\n'))
+    return ''.join(chunks).strip()
+
+
+# Minified once at import; this is what create_advanced_chatbot_page writes
+_CHATBOT_HTML_MIN = _minify_html(_CHATBOT_HTML)
+
+
+def create_advanced_chatbot_page():
+    """Create enhanced HTML page for the advanced AI trading partner"""
+    path = 'chatbot.html'
+    try:
+        with open(path, encoding='utf-8') as f:
+            unchanged = f.read() == _CHATBOT_HTML_MIN
+    except (OSError, UnicodeDecodeError):
+        unchanged = False
+    if unchanged:
+        print("Advanced AI Trading Partner page already up to date: chatbot.html")
+        return
     
-    with open('chatbot.html', 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    # Write beside the target and swap it in, so the server never reads a half-written page
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(_CHATBOT_HTML_MIN)
+    os.replace(tmp_path, path)
     
     print("Advanced AI Trading Partner page updated: chatbot.html")
 
@@ -1,21 +1,70 @@
 # Vercel Python serverless function - FULL API with Yahoo Finance integration
 from flask import Flask, jsonify, request, send_from_directory
-from flask_cors import CORS
-import os
-from datetime import datetime, timedelta
-import json
-
-# Try to import yfinance for real data
-try:
-    import yfinance as yf
-    import pandas as pd
-    YFINANCE_AVAILABLE = True
-except ImportError:
-    YFINANCE_AVAILABLE = False
-    pd = None
+import hashlib
+import heapq
+import importlib.util
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
 
+from json_provider import use_orjson
+
+# yfinance (and the pandas it pulls in) is only imported by the endpoints that
+# use it, so cold starts of the other routes skip that cost
+YFINANCE_AVAILABLE = importlib.util.find_spec('yfinance') is not None
+
+@lru_cache(maxsize=1)
+def _yf():
+    """Import yfinance on first use; None if it is unavailable"""
+    try:
+        import yfinance
+        return yfinance
+    except ImportError:
+        return None
+
+@lru_cache(maxsize=1)
+def _yahoo_session():
+    """Keep-alive HTTP session shared by every Yahoo call; yfinance otherwise
+    opens a fresh connection (and TLS handshake) per request"""
+    import requests
+    return requests.Session()
+
+def _ticker(symbol):
+    """yf.Ticker for symbol, bound to the shared session"""
+    return _yf().Ticker(symbol, session=_yahoo_session())
+
+# yf.download in the pinned yfinance collects results in module-level dicts, so
+# overlapping calls from concurrent requests could mix up their tickers
+_DOWNLOAD_LOCK = threading.Lock()
+
+def _download(tickers, **kwargs):
+    """yf.download on the shared session, one call at a time"""
+    with _DOWNLOAD_LOCK:
+        return _yf().download(tickers, session=_yahoo_session(), **kwargs)
+
+# The static route serves the pages and live_trading_signals.json at /<filename>
 app = Flask(__name__, static_folder='../', static_url_path='')
-CORS(app)
+use_orjson(app)
+
+# Open CORS for every origin, set directly instead of through flask_cors
+@app.before_request
+def _answer_preflight():
+    """Reply to CORS preflight requests before routing"""
+    if request.method == 'OPTIONS':
+        response = app.response_class(status=204)
+        response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+        response.headers['Access-Control-Allow-Headers'] = request.headers.get('Access-Control-Request-Headers', '')
+        response.headers['Access-Control-Max-Age'] = '86400'
+        return response
+
+@app.after_request
+def _allow_any_origin(response):
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
 
 # ============================================================================
 # HTML FILE SERVING
@@ -29,16 +78,6 @@ def index():
     except:
         return jsonify({'status': 'ok', 'message': 'API is running'})
 
-@app.route('/<path:filename>')
-def serve_files(filename):
-    """Serve HTML files and other static files"""
-    if filename.endswith('.html'):
-        try:
-            return send_from_directory('../', filename)
-        except:
-            pass
-    return jsonify({'error': 'File not found'}), 404
-
 # ============================================================================
 # API ROUTES
 # ============================================================================
@@ -60,116 +99,270 @@ def api_root():
         }
     })
 
+def _cacheable(payload, max_age, stamp='timestamp'):
+    """jsonify() a market payload with browser/edge cache headers and an ETag,
+    answering a matching If-None-Match with an empty 304. The ETag leaves out
+    the payload's generation time so unchanged data still revalidates."""
+    response = jsonify(payload)
+    response.headers['Cache-Control'] = f'public, max-age={max_age}, s-maxage={max_age}, stale-while-revalidate=300'
+    content = app.json.dumps({key: value for key, value in payload.items() if key != stamp})
+    response.set_etag(hashlib.sha1(content.encode()).hexdigest())
+    return response.make_conditional(request)
+
+# Tickers sampled by each market endpoint
+_STATS_TICKERS = ('AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA', 'TSLA', 'META', 'NFLX')
+_NEWS_TICKERS = ('SPY', 'QQQ', 'NVDA', 'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA')
+_SIGNAL_TICKERS = ('NVDA', 'AAPL', 'TSLA', 'MSFT', 'GOOGL', 'AMZN', 'META', 'NFLX', 'AMD', 'INTC')
+_OPPORTUNITY_TICKERS = ('NVDA', 'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA', 'META', 'AMD', 'NFLX', 'CRM')
+
+def _stats_payload(_key):
+    """Recommendation tallies over _STATS_TICKERS, or None when no ticker
+    answered, so that _cached_yahoo doesn't keep an outage's zeros"""
+    infos = _fetch_all(_fetch_ticker_info, _STATS_TICKERS)
+    if not any(infos):
+        return None
+    
+    now_iso = datetime.now().isoformat()
+    # Get real-time stats by analyzing top tickers
+    strong_buys = 0
+    buys = 0
+    
+    for ticker, info in zip(_STATS_TICKERS, infos):
+        try:
+            if info and 'recommendationMean' in info:
+                rec = info['recommendationMean']
+                if rec <= 1.5:
+                    strong_buys += 1
+                elif rec <= 2.5:
+                    buys += 1
+        except _PAYLOAD_ERRORS as e:
+            print(f"Skipping {ticker} in stats: {e!r}")
+    
+    return {
+        'total_assets': len(_STATS_TICKERS),
+        'total_universe': 2076,
+        'strong_buys': strong_buys,
+        'buys': buys,
+        'last_update': now_iso
+    }
+
 @app.route('/api/stats')
 def stats():
     """Get platform statistics"""
-    if not YFINANCE_AVAILABLE:
+    now_iso = datetime.now().isoformat()
+    yf = _yf()
+    if yf is None:
         return jsonify({
             'total_assets': 0,
             'total_universe': 2076,
             'strong_buys': 0,
             'buys': 0,
-            'last_update': datetime.now().isoformat()
+            'last_update': now_iso
         })
     
     try:
-        # Get real-time stats by analyzing top tickers
-        top_tickers = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA', 'TSLA', 'META', 'NFLX']
-        strong_buys = 0
-        buys = 0
-        
-        for ticker in top_tickers:
-            try:
-                stock = yf.Ticker(ticker)
-                info = stock.info
-                if info and 'recommendationMean' in info:
-                    rec = info['recommendationMean']
-                    if rec <= 1.5:
-                        strong_buys += 1
-                    elif rec <= 2.5:
-                        buys += 1
-            except:
-                continue
-        
-        return jsonify({
-            'total_assets': len(top_tickers),
-            'total_universe': 2076,
-            'strong_buys': strong_buys,
-            'buys': buys,
-            'last_update': datetime.now().isoformat()
-        })
+        # Every request in the same 300s window shares one build of the payload
+        payload = _cached_yahoo('payload', 'stats', 300, _stats_payload)
+        if payload is None:
+            # Yahoo is failing: report empty tallies for now and ask again next request
+            return jsonify({
+                'total_assets': len(_STATS_TICKERS),
+                'total_universe': 2076,
+                'strong_buys': 0,
+                'buys': 0,
+                'last_update': now_iso
+            })
+        return _cacheable(payload, 60, 'last_update')
     except Exception as e:
         return jsonify({
             'total_assets': 100,
             'total_universe': 2076,
             'strong_buys': 15,
             'buys': 30,
-            'last_update': datetime.now().isoformat(),
+            'last_update': now_iso,
             'error': str(e)
         })
 
+# Yahoo lookups and the endpoint payloads built from them, shared across requests:
+# {(kind, key): (expiry, data)} on the monotonic clock
+_YAHOO_CACHE = {}
+
+# Seconds a cached .info / .news payload stays fresh
+_INFO_TTL = 60
+_NEWS_TTL = 120
+
+def _cached_yahoo(kind, ticker, ttl, fetch):
+    """Return fetch(ticker), reusing a non-empty result for ttl seconds"""
+    now = time.monotonic()
+    entry = _YAHOO_CACHE.get((kind, ticker))
+    if entry and entry[0] > now:
+        return entry[1]
+    
+    data = fetch(ticker)
+    # Empty answers are often a passing Yahoo hiccup, so they are asked again next time
+    if data is not None and len(data):
+        if len(_YAHOO_CACHE) >= 2048:
+            _YAHOO_CACHE.clear()
+        _YAHOO_CACHE[(kind, ticker)] = (now + ttl, data)
+    return data
+
+def _fetch_ticker_news(ticker):
+    """Yahoo news articles for one ticker, or None if the lookup fails"""
+    try:
+        return _cached_yahoo('news', ticker, _NEWS_TTL, lambda t: _ticker(t).news)
+    except Exception:
+        return None
+
+# quoteSummary endpoint used by the pinned yfinance, asked only for the modules
+# holding the quote fields the endpoints read
+_QUOTE_URL = 'https://query2.finance.yahoo.com/v6/finance/quoteSummary/'
+_QUOTE_MODULES = 'price,summaryDetail,financialData'
+_QUOTE_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/39.0.2171.95 Safari/537.36'}
+
+class QuoteNotFound(Exception):
+    """Yahoo answered, but has no quote for the ticker"""
+
+def _quote_summary(ticker):
+    """.info-style flat dict of one ticker's price, summary and analyst fields.
+    Raises QuoteNotFound for a ticker Yahoo doesn't know, and requests/ValueError
+    errors for failed or non-JSON responses (rate limits, error pages).
+
+    yf.Ticker(t).info asks for five modules (company profile and key statistics
+    included) and then makes a second timeseries request; this is one small call."""
+    response = _yahoo_session().get(
+        _QUOTE_URL + ticker, params={'modules': _QUOTE_MODULES, 'ssl': 'true'},
+        headers=_QUOTE_HEADERS, timeout=_FETCH_TIMEOUT
+    )
+    if response.status_code == 404:
+        raise QuoteNotFound(ticker)
+    response.raise_for_status()
+    try:
+        summary = response.json().get('quoteSummary') or {}
+    except ValueError as e:
+        raise ValueError(f"Non-JSON quoteSummary response for {ticker}") from e
+    if summary.get('error') or not summary.get('result'):
+        raise QuoteNotFound(ticker)
+    results = summary['result']
+    
+    info = {}
+    for module in results[0].values():
+        if isinstance(module, dict):
+            for key, value in module.items():
+                if isinstance(value, dict):
+                    value = value.get('raw')
+                if value is not None:
+                    info[key] = value
+    # The price module reports the day's move as a fraction; callers expect percent
+    if 'regularMarketChangePercent' in info:
+        info['regularMarketChangePercent'] *= 100
+    return info
+
+def _fetch_ticker_info(ticker):
+    """Quote fields for one ticker, or None if the lookup fails"""
+    try:
+        return _cached_yahoo('info', ticker, _INFO_TTL, _quote_summary)
+    except Exception:
+        return None
+
+# Seconds an endpoint waits on its Yahoo lookups; slower tickers are left out
+_FETCH_TIMEOUT = 5
+
+# Missing or malformed fields in a Yahoo payload, skipped per ticker or article
+_PAYLOAD_ERRORS = (KeyError, TypeError, ValueError, ArithmeticError, OSError)
+
+def _pick(info, keys, default=None):
+    """First of info's keys holding a value (zero included), else default"""
+    return next((info[k] for k in keys if info.get(k) is not None), default)
+
+# Lookup workers kept for the life of the process; threads start on first use,
+# so warm invocations reuse them instead of spawning a pool per request
+_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix='yahoo')
+
+def _fetch_all(fetch, tickers):
+    """Run blocking per-ticker Yahoo lookups concurrently, results in ticker order"""
+    # Build the shared session here so the workers don't each race to create one
+    _yahoo_session()
+    futures = [_EXECUTOR.submit(fetch, ticker) for ticker in tickers]
+    done, pending = wait(futures, timeout=_FETCH_TIMEOUT)
+    # Lookups already running finish in the background and still fill the cache;
+    # ones still queued are dropped so they don't hold up the next request
+    for future in pending:
+        future.cancel()
+    return [future.result() if future in done else None for future in futures]
+
+# Headline keywords behind each article's impact tag: word stems keep their
+# inflections ("surged", "falling"), while up/down must stand alone so that
+# "upgrade" or "download" don't count
+_POSITIVE_RE = re.compile(r'\b(?:up\b|(?:surg(?:e|ing)|jump|gain|rall(?:y|ie)|ris(?:e|ing)|soar)\w*)', re.IGNORECASE)
+_NEGATIVE_RE = re.compile(r'\b(?:down\b|(?:drop|fall|crash|plunge|decline|dip)\w*)', re.IGNORECASE)
+
+def _news_payload(_key):
+    """Newest deduplicated Yahoo headlines for _NEWS_TICKERS with a sentiment tag"""
+    now_iso = datetime.now().isoformat()
+    news_items = []
+    seen_titles = set()
+    
+    # Each .news lookup is a blocking round-trip, so fetch them concurrently
+    for ticker, stock_news in zip(_NEWS_TICKERS, _fetch_all(_fetch_ticker_news, _NEWS_TICKERS)):
+        try:
+            if stock_news:
+                for article in stock_news[:3]:  # Get top 3 per ticker
+                    # Stories filed under several tickers keep their first occurrence
+                    title = article.get('title', 'No title')
+                    if title in seen_titles:
+                        continue
+                    published = article.get('providerPublishTime', 0)
+                    pub_time = datetime.fromtimestamp(published)
+                    seen_titles.add(title)
+                    
+                    # Determine sentiment from title and summary in one scan each
+                    # (a missing summary falls back to the title, which scans the same)
+                    summary = article.get('summary', article.get('title', ''))
+                    text = f"{title} {summary}"
+                    impact = 'neutral'
+                    if _POSITIVE_RE.search(text):
+                        impact = 'positive'
+                    elif _NEGATIVE_RE.search(text):
+                        impact = 'negative'
+                    
+                    news_items.append((published, {
+                        'title': title,
+                        'summary': summary,
+                        'impact': impact,
+                        'timestamp': pub_time.isoformat(),
+                        'source': article.get('publisher', 'Unknown'),
+                        'tickers': [ticker],
+                        'url': article.get('link', ''),
+                        'category': 'market'
+                    }))
+        except _PAYLOAD_ERRORS as e:
+            print(f"Skipping {ticker} news: {e!r}")
+    
+    # Newest 30 by raw publish time
+    latest_news = [item for _, item in heapq.nlargest(30, news_items, key=itemgetter(0))]
+    
+    return {
+        'timestamp': now_iso,
+        'news': latest_news
+    }
+
 @app.route('/api/news')
 def news():
     """Get real news from Yahoo Finance"""
-    if not YFINANCE_AVAILABLE:
+    now_iso = datetime.now().isoformat()
+    yf = _yf()
+    if yf is None:
         return jsonify({
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now_iso,
             'news': []
         })
     
     try:
-        news_items = []
-        top_tickers = ['SPY', 'QQQ', 'NVDA', 'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA', 'META', 'NFLX']
-        
-        for ticker in top_tickers[:8]:
-            try:
-                stock = yf.Ticker(ticker)
-                stock_news = stock.news
-                
-                if stock_news:
-                    for article in stock_news[:3]:  # Get top 3 per ticker
-                        pub_time = datetime.fromtimestamp(article.get('providerPublishTime', 0))
-                        
-                        # Determine sentiment from title
-                        title = article.get('title', '').lower()
-                        summary = article.get('summary', '').lower()
-                        impact = 'neutral'
-                        if any(word in title or word in summary for word in ['surge', 'jump', 'up', 'gain', 'rally', 'rise', 'soar']):
-                            impact = 'positive'
-                        elif any(word in title or word in summary for word in ['drop', 'fall', 'down', 'crash', 'plunge', 'decline', 'dip']):
-                            impact = 'negative'
-                        
-                        news_items.append({
-                            'title': article.get('title', 'No title'),
-                            'summary': article.get('summary', article.get('title', '')),
-                            'impact': impact,
-                            'timestamp': pub_time.isoformat(),
-                            'source': article.get('publisher', 'Unknown'),
-                            'tickers': [ticker],
-                            'url': article.get('link', ''),
-                            'category': 'market'
-                        })
-            except Exception as e:
-                continue
-        
-        # Sort by timestamp and remove duplicates
-        seen_titles = set()
-        unique_news = []
-        for item in news_items:
-            if item['title'] not in seen_titles:
-                seen_titles.add(item['title'])
-                unique_news.append(item)
-        
-        # Sort by timestamp
-        unique_news.sort(key=lambda x: x['timestamp'], reverse=True)
-        
-        return jsonify({
-            'timestamp': datetime.now().isoformat(),
-            'news': unique_news[:30]  # Return top 30
-        })
+        # Every request in the same 60s window shares one build of the payload
+        return _cacheable(_cached_yahoo('payload', 'news', 60, _news_payload), 60)
     except Exception as e:
         return jsonify({
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now_iso,
             'news': [],
             'error': str(e)
         })
@@ -177,60 +370,69 @@ def news():
 @app.route('/api/urgent-signals')
 def urgent_signals():
     """Get urgent trading signals based on real-time data"""
-    if not YFINANCE_AVAILABLE:
+    now_iso = datetime.now().isoformat()
+    yf = _yf()
+    if yf is None:
         return jsonify({
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now_iso,
             'signals': [],
             'count': 0
         })
     
+    import numpy as np
+    
     try:
         signals = []
-        # Track major movers
-        tickers_to_check = ['NVDA', 'AAPL', 'TSLA', 'MSFT', 'GOOGL', 'AMZN', 'META', 'NFLX', 'AMD', 'INTC']
+        # One batched daily-close download instead of a slow .info call per ticker;
+        # the last row is today's bar, so its move vs the prior close is the day's change
+        closes = _cached_yahoo(
+            'closes', ' '.join(_SIGNAL_TICKERS), 60,
+            lambda t: _download(t, period='5d', interval='1d', progress=False)['Close']
+        )
         
-        for ticker in tickers_to_check:
-            try:
-                stock = yf.Ticker(ticker)
-                info = stock.info
+        # Last two closes of every ticker at once, skipping gaps: a stable sort of
+        # the validity mask moves each column's valid rows to the end, in order
+        values = closes.reindex(columns=list(_SIGNAL_TICKERS)).to_numpy(dtype=float)
+        if len(values) >= 2:
+            valid = ~np.isnan(values)
+            order = np.argsort(valid, axis=0, kind='stable')
+            columns = np.arange(len(_SIGNAL_TICKERS))
+            current = values[order[-1], columns]
+            previous = values[order[-2], columns]
+            change = current - previous
+            with np.errstate(divide='ignore', invalid='ignore'):
+                change_pct = change / previous * 100
+            
+            # Only flag significant moves (>2% change), largest first
+            flagged = np.flatnonzero((valid.sum(axis=0) >= 2) & (previous != 0) & (np.abs(change_pct) > 2))
+            flagged = flagged[np.argsort(-np.abs(change_pct[flagged]), kind='stable')]
+            
+            for i in flagged.tolist():
+                current_price = float(current[i])
+                move = float(change[i])
+                change_percent = float(change_pct[i])
+                signal_type = 'Buy' if move > 0 else 'Sell'
+                priority = 'High' if abs(change_percent) > 5 else 'Medium'
                 
-                if not info:
-                    continue
-                
-                # Get current price and change
-                current_price = info.get('regularMarketPrice') or info.get('currentPrice') or 0
-                change = info.get('regularMarketChange', 0)
-                change_percent = info.get('regularMarketChangePercent', 0)
-                
-                # Only flag significant moves (>2% change)
-                if abs(change_percent) > 2:
-                    signal_type = 'Buy' if change > 0 else 'Sell'
-                    priority = 'High' if abs(change_percent) > 5 else 'Medium'
-                    
-                    signals.append({
-                        'ticker': ticker,
-                        'type': signal_type,
-                        'price': round(current_price, 2),
-                        'change': f"{'+' if change >= 0 else ''}{round(change, 2)}",
-                        'changePercent': f"{'+' if change_percent >= 0 else ''}{round(change_percent, 2)}%",
-                        'signalTime': 'Just now',
-                        'reason': f"Significant {signal_type.lower()} signal due to {abs(change_percent):.1f}% price movement",
-                        'priority': priority
-                    })
-            except:
-                continue
-        
-        # Sort by absolute change percentage
-        signals.sort(key=lambda x: abs(float(x['changePercent'].replace('%', '').replace('+', ''))), reverse=True)
+                signals.append({
+                    'ticker': _SIGNAL_TICKERS[i],
+                    'type': signal_type,
+                    'price': round(current_price, 2),
+                    'change': f"{'+' if move >= 0 else ''}{round(move, 2)}",
+                    'changePercent': f"{'+' if change_percent >= 0 else ''}{round(change_percent, 2)}%",
+                    'signalTime': 'Just now',
+                    'reason': f"Significant {signal_type.lower()} signal due to {abs(change_percent):.1f}% price movement",
+                    'priority': priority
+                })
         
         return jsonify({
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now_iso,
             'signals': signals[:10],
             'count': len(signals)
         })
     except Exception as e:
         return jsonify({
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now_iso,
             'signals': [],
             'count': 0,
             'error': str(e)
@@ -239,15 +441,18 @@ def urgent_signals():
 @app.route('/api/ticker/<ticker>')
 def ticker_data(ticker):
     """Get real-time ticker data"""
-    if not YFINANCE_AVAILABLE:
+    yf = _yf()
+    if yf is None:
         return jsonify({
             'error': 'yfinance not available',
             'ticker': ticker.upper()
         }), 503
     
     try:
-        stock = yf.Ticker(ticker.upper())
-        info = stock.info
+        try:
+            info = _cached_yahoo('info', ticker.upper(), _INFO_TTL, _quote_summary)
+        except QuoteNotFound:
+            info = None
         
         if not info:
             return jsonify({
@@ -256,13 +461,9 @@ def ticker_data(ticker):
             }), 404
         
         # Get real-time price
-        price = (
-            info.get('regularMarketPrice') or 
-            info.get('currentPrice') or 
-            info.get('previousClose')
-        )
+        price = _pick(info, ('regularMarketPrice', 'currentPrice', 'previousClose'))
         
-        return jsonify({
+        return _cacheable({
             'ticker': ticker.upper(),
             'name': info.get('longName', ticker.upper()),
             'price': price,
@@ -273,7 +474,7 @@ def ticker_data(ticker):
             'pe_ratio': info.get('trailingPE', 0),
             'dividend_yield': info.get('dividendYield', 0),
             'last_updated': datetime.now().isoformat()
-        })
+        }, 10, 'last_updated')
     except Exception as e:
         return jsonify({
             'error': str(e),
@@ -283,56 +484,55 @@ def ticker_data(ticker):
 @app.route('/api/top-opportunities')
 def top_opportunities():
     """Get top investment opportunities"""
-    if not YFINANCE_AVAILABLE:
+    now_iso = datetime.now().isoformat()
+    yf = _yf()
+    if yf is None:
         return jsonify({
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now_iso,
             'opportunities': []
         })
     
+    import numpy as np
+    
     try:
-        opportunities = []
-        top_tickers = ['NVDA', 'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA', 'META', 'AMD', 'NFLX', 'CRM']
+        candidates = []
         
-        for ticker in top_tickers:
+        for ticker, info in zip(_OPPORTUNITY_TICKERS, _fetch_all(_fetch_ticker_info, _OPPORTUNITY_TICKERS)):
             try:
-                stock = yf.Ticker(ticker)
-                info = stock.info
-                
                 if not info:
                     continue
                 
-                price = info.get('regularMarketPrice') or info.get('currentPrice') or 0
                 change_percent = info.get('regularMarketChangePercent', 0)
                 recommendation = info.get('recommendationMean', 3.0)
-                
-                # Calculate opportunity score
-                opportunity_score = 0
-                if recommendation <= 2.0:
-                    opportunity_score += 30
-                if change_percent > 0:
-                    opportunity_score += abs(change_percent) * 2
-                
-                opportunities.append({
-                    'ticker': ticker,
-                    'name': info.get('longName', ticker),
-                    'price': price,
-                    'change_percent': round(change_percent, 2),
-                    'opportunity_score': round(opportunity_score, 1),
-                    'recommendation': 'Strong Buy' if recommendation <= 1.5 else 'Buy' if recommendation <= 2.5 else 'Hold'
-                })
-            except:
-                continue
+                candidates.append((ticker, info, change_percent, float(change_percent), float(recommendation)))
+            except _PAYLOAD_ERRORS as e:
+                print(f"Skipping {ticker} in top opportunities: {e!r}")
         
-        # Sort by opportunity score
-        opportunities.sort(key=lambda x: x['opportunity_score'], reverse=True)
+        # Score every ticker at once: 30 for a buy-rated consensus plus twice any gain
+        change_pct = np.array([c[3] for c in candidates])
+        recommendation = np.array([c[4] for c in candidates])
+        scores = np.where(recommendation <= 2.0, 30.0, 0.0) + np.where(change_pct > 0, change_pct * 2, 0.0)
         
-        return jsonify({
-            'timestamp': datetime.now().isoformat(),
-            'opportunities': opportunities[:5]
-        })
+        # Best 5 by opportunity score
+        opportunities = []
+        for i in np.argsort(-scores, kind='stable')[:5].tolist():
+            ticker, info, change_percent, _, rec = candidates[i]
+            opportunities.append({
+                'ticker': ticker,
+                'name': info.get('longName', ticker),
+                'price': _pick(info, ('regularMarketPrice', 'currentPrice'), 0),
+                'change_percent': round(change_percent, 2),
+                'opportunity_score': round(float(scores[i]), 1),
+                'recommendation': 'Strong Buy' if rec <= 1.5 else 'Buy' if rec <= 2.5 else 'Hold'
+            })
+        
+        return _cacheable({
+            'timestamp': now_iso,
+            'opportunities': opportunities
+        }, 60)
     except Exception as e:
         return jsonify({
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now_iso,
             'opportunities': [],
             'error': str(e)
         })
@@ -0,0 +1,43 @@
+"""
+Flask JSON Provider
+jsonify() backed by orjson when it is installed, shared by api/index.py and app.py.
+Kept next to index.py because the Vercel function is deployed from this directory.
+"""
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+
+# orjson is optional; jsonify falls back to the stdlib encoder without it
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class OrjsonProvider(DefaultJSONProvider):
+    """jsonify() backed by orjson's native encoder, keys sorted like Flask's default"""
+    OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY if orjson else 0
+    
+    def dumps(self, obj, **kwargs):
+        option = self.OPTIONS | orjson.OPT_INDENT_2 if kwargs.get('indent') else self.OPTIONS
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        """Same contract as DefaultJSONProvider.response, minus the str
+        round-trip: orjson already produces UTF-8 bytes"""
+        if args and kwargs:
+            raise TypeError("app.json.response() takes either args or kwargs, not both")
+        obj = args[0] if len(args) == 1 else args or kwargs or None
+        
+        option = self.OPTIONS | orjson.OPT_APPEND_NEWLINE
+        if (self.compact is None and current_app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        body = orjson.dumps(obj, default=self.default, option=option)
+        return current_app.response_class(body, mimetype=self.mimetype)
+
+def use_orjson(app):
+    """Serve app's JSON through OrjsonProvider when orjson is installed"""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
@@ -5,34 +5,51 @@ Provides real-time data updates, alerts, and portfolio management
 
 from flask import Flask, jsonify, request, send_from_directory
 from flask_cors import CORS
-import json
+from werkzeug.security import safe_join
+import gzip
 import os
+import zlib
 from datetime import datetime, timedelta
+from itertools import count, islice
 import yfinance as yf
 import pandas as pd
 import numpy as np
 from typing import Dict, List
 import threading
 import time
+from collections import Counter
+from operator import itemgetter
+from api.json_provider import use_orjson
 
 app = Flask(__name__)
+use_orjson(app)
 CORS(app)
 
 # Import our existing trading intelligence backend
 try:
     from scorpion_backend import (
         UNIVERSE, ALL_TICKERS, analyze_asset, run_live_analysis,
-        get_urgent_signals, get_news_feed, fetch_chart_data
+        get_urgent_signals, get_news_feed, fetch_chart_data, save_signals
     )
 except ImportError:
     # Fallback if scorpion_backend doesn't exist
     UNIVERSE = {}
     ALL_TICKERS = []
     def analyze_asset(ticker): return {}
-    def run_live_analysis(): return {}
+    def run_live_analysis(sample_size=None, save=True): return {}
     def get_urgent_signals(): return []
     def get_news_feed(): return []
     def fetch_chart_data(ticker): return {}
+    def save_signals(data): pass
+
+# Display name per sector, formatted once and shared by every row of that sector
+_SECTOR_NAMES = {sector: sector.replace('_', ' ').title() for sector in UNIVERSE}
+
+# /api/search candidates in universe order: (upper-cased ticker, ticker, display sector)
+_SEARCH_INDEX = tuple(
+    (ticker.upper(), ticker, _SECTOR_NAMES[sector])
+    for sector, tickers in UNIVERSE.items() for ticker in tickers
+)
 
 # Import AI chatbot
 try:
@@ -55,70 +72,211 @@ except ImportError:
 
 # Global data storage
 market_data = {}
-portfolio_data = {}
-alerts_data = []
+# Positions keyed by ticker and alerts keyed by id, so lookups and deletes are O(1)
+portfolio_data = {'positions': {}}
+alerts_data = {}
+_alert_ids = count(1)
 news_data = []
 
-def update_market_data():
-    """Background task to update market data every 5 minutes"""
-    global market_data, news_data
+def portfolio_snapshot():
+    """Portfolio in its JSON shape, with positions as a list"""
+    return {**portfolio_data, 'positions': list(portfolio_data['positions'].values())}
+
+def update_market_data(sample_size: int = 100):
+    """Run one analysis pass and publish it as the current market snapshot.
+    Shared by the lazy background refresh and /api/refresh; errors propagate."""
+    global market_data, news_data, _last_refresh
     
-    while True:
-        try:
-            print("Updating market data...")
-            
-            # Run analysis on a sample of assets for performance
-            sample_size = min(100, len(ALL_TICKERS))
-            results = run_live_analysis(sample_size=sample_size)
-            
-            # Store the results
-            market_data = {
-                'timestamp': datetime.now().isoformat(),
-                'assets': results,
-                'total_analyzed': len(results)
-            }
-            
-            # Update news data
-            news_data = get_news_feed()
-            
-            # Save to file for the standalone dashboard
-            with open('live_trading_signals.json', 'w') as f:
-                json.dump(market_data, f, indent=2)
-            
-            print(f"Updated {len(results)} assets")
-            
-        except Exception as e:
-            print(f"Error updating market data: {e}")
+    print("Updating market data...")
+    
+    # Run analysis on a sample of assets for performance; the snapshot file is
+    # written below, so the backend's own save is skipped
+    results = run_live_analysis(sample_size=min(sample_size, len(ALL_TICKERS)), save=False)
+    
+    # Swap in a whole new snapshot so readers never see assets and timestamp out of step
+    market_data = {
+        'timestamp': datetime.now().isoformat(),
+        'assets': results,
+        'total_analyzed': len(results)
+    }
+    
+    # Update news data
+    news_data = get_news_feed()
+    
+    # Save to file for the standalone dashboard (atomic, see save_signals)
+    save_signals(market_data)
+    
+    # Per-ticker analyses predate this pass
+    _ANALYSIS_CACHE.clear()
+    _last_refresh = time.monotonic()
+    
+    print(f"Updated {len(results)} assets")
+    return market_data
+
+# Seconds a market snapshot stays fresh; the first API request after that
+# starts a refresh, so an idle server does no analysis at all
+MARKET_DATA_TTL = 300
+# Only in local development: serverless instances are frozen between requests
+LAZY_REFRESH = os.environ.get('VERCEL') != '1'
+# Held for the whole of any refresh, lazy or manual, so they never overlap
+_refresh_lock = threading.Lock()
+_last_refresh = float('-inf')
+
+def _refresh_in_background():
+    """Worker for refresh_if_stale(); frees the single-flight lock when done"""
+    global _last_refresh
+    try:
+        update_market_data()
+    except Exception as e:
+        print(f"Error updating market data: {e}")
+        # Wait a full interval before retrying rather than retrying on every request
+        _last_refresh = time.monotonic()
+    finally:
+        _refresh_lock.release()
+
+@app.before_request
+def refresh_if_stale():
+    """Start a background refresh when an API request finds the snapshot stale.
+    The request is answered from the current snapshot, and at most one
+    refresh runs at a time. /api/refresh runs its own refresh instead."""
+    if (LAZY_REFRESH and request.path.startswith('/api/') and request.endpoint != 'refresh_data'
+            and time.monotonic() - _last_refresh > MARKET_DATA_TTL
+            and _refresh_lock.acquire(blocking=False)):
+        threading.Thread(target=_refresh_in_background, daemon=True).start()
+
+# Latest prices by ticker: (fetched_at, price), reused for _PRICE_TTL seconds
+# in fetch order (oldest first), capped at _PRICE_CACHE_SIZE
+_PRICE_CACHE: Dict[str, tuple] = {}
+_PRICE_TTL = 15
+_PRICE_CACHE_SIZE = 2048
+# Fixed pool of locks striped by ticker hash, so simultaneous misses on a ticker
+# share a single Yahoo request without keeping a lock per ticker ever asked for
+_PRICE_LOCKS = tuple(threading.Lock() for _ in range(64))
+
+# .info fields tried in order when fast_info has no usable price
+_PRICE_FIELDS = ('regularMarketPrice', 'currentPrice', 'regularMarketPreviousClose', 'previousClose')
+
+def _fetch_price(ticker: str):
+    """Latest price from fast_info (a small chart request), falling back to the
+    full .info quote; None if Yahoo has neither"""
+    stock = yf.Ticker(ticker)
+    try:
+        quote = stock.fast_info
+        price = quote['lastPrice'] or quote['previousClose']
+    except Exception:
+        price = None
+    if price is not None and price == price:  # NaN when the chart has no close
+        return price
+    
+    info = stock.info
+    if not info:
+        return None
+    return next((info[k] for k in _PRICE_FIELDS if info.get(k) is not None), None)
+
+def live_price(ticker: str):
+    """Latest price for ticker, reusing a recent lookup of the same ticker"""
+    entry = _PRICE_CACHE.get(ticker)
+    if entry and time.monotonic() - entry[0] < _PRICE_TTL:
+        return entry[1]
+    
+    with _PRICE_LOCKS[hash(ticker) % len(_PRICE_LOCKS)]:
+        # Another request may have fetched it while this one waited
+        entry = _PRICE_CACHE.get(ticker)
+        now = time.monotonic()
+        if entry and now - entry[0] < _PRICE_TTL:
+            return entry[1]
         
-        # Wait 5 minutes before next update
-        time.sleep(300)
+        price = _fetch_price(ticker)
+        # Re-insert at the end so the dict stays in fetch order, then evict
+        # from the front (the oldest entries) to stay under the cap
+        _PRICE_CACHE.pop(ticker, None)
+        while len(_PRICE_CACHE) >= _PRICE_CACHE_SIZE:
+            try:
+                _PRICE_CACHE.pop(next(iter(_PRICE_CACHE)), None)
+            except (StopIteration, RuntimeError):  # emptied or resized by another thread
+                break
+        _PRICE_CACHE[ticker] = (now, price)
+        return price
+
+# analyze_asset() results by ticker: (analyzed_at, analysis), reused for _ANALYSIS_TTL seconds
+_ANALYSIS_CACHE: Dict[str, tuple] = {}
+_ANALYSIS_TTL = 30
+
+def cached_analysis(ticker: str):
+    """analyze_asset(ticker), reusing a recent analysis of the same ticker.
+    Returns a copy so callers can stamp it without touching the cached entry."""
+    entry = _ANALYSIS_CACHE.get(ticker)
+    now = time.monotonic()
+    if not entry or now - entry[0] >= _ANALYSIS_TTL:
+        if len(_ANALYSIS_CACHE) >= 2048:
+            _ANALYSIS_CACHE.clear()
+        entry = _ANALYSIS_CACHE[ticker] = (now, analyze_asset(ticker))
+    return dict(entry[1]) if entry[1] else entry[1]
 
-def start_background_tasks():
-    """Start background data update tasks"""
-    update_thread = threading.Thread(target=update_market_data, daemon=True)
-    update_thread.start()
+# Gzipped HTML pages by path: (mtime, size, body, etag), compressed on first request
+_GZIP_PAGES: Dict[str, tuple] = {}
+
+def send_page(directory: str, filename: str):
+    """Serve a file, sending HTML pages gzip-encoded to clients that accept it"""
+    path = safe_join(os.path.join(app.root_path, directory), filename)
+    if path is None or not filename.endswith('.html') or not os.path.isfile(path):
+        return send_from_directory(directory, filename)
+    
+    if request.accept_encodings['gzip'] <= 0:
+        response = send_from_directory(directory, filename)
+    else:
+        stat = os.stat(path)
+        cached = _GZIP_PAGES.get(path)
+        if cached is None or cached[:2] != (stat.st_mtime, stat.st_size):
+            with open(path, 'rb') as f:
+                body = gzip.compress(f.read(), compresslevel=9, mtime=0)
+            cached = _GZIP_PAGES[path] = (stat.st_mtime, stat.st_size, body, f"{zlib.crc32(body):08x}-gz")
+        response = app.response_class(cached[2], mimetype='text/html')
+        response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(cached[3])
+        response = response.make_conditional(request)
+    response.vary.add('Accept-Encoding')
+    return response
+
+# JSON bodies smaller than this go out uncompressed; gzip framing isn't worth it
+_GZIP_MIN_SIZE = 1024
+
+@app.after_request
+def gzip_json(response):
+    """Gzip-encode sizeable JSON API responses for clients that accept it"""
+    if (response.mimetype != 'application/json' or response.direct_passthrough
+            or 'Content-Encoding' in response.headers):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) >= _GZIP_MIN_SIZE and request.accept_encodings['gzip'] > 0:
+        # Level 6 keeps per-request CPU low; these bodies change every refresh
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
 
 # API Routes
 
 @app.route('/')
 def index():
     """Serve the main dashboard"""
-    return send_from_directory('.', 'index.html')
+    return send_page('.', 'index.html')
 
 @app.route('/dashboard')
 def dashboard():
     """Serve the main Scorpion Copilot dashboard"""
-    return send_from_directory('.', 'ScorpionCopilot_Dashboard.html')
+    return send_page('.', 'ScorpionCopilot_Dashboard.html')
 
 @app.route('/TradingIntelligence_Dashboard.html')
 def trading_dashboard():
     """Serve the Trading Intelligence dashboard"""
-    return send_from_directory('.', 'TradingIntelligence_Dashboard.html')
+    return send_page('.', 'TradingIntelligence_Dashboard.html')
 
 @app.route('/<path:filename>')
 def serve_html(filename):
     """Serve HTML files"""
-    return send_from_directory('.', filename)
+    return send_page('.', filename)
 
 @app.route('/api/market-data')
 def get_market_data():
@@ -155,23 +313,11 @@ def get_news_api():
 def get_asset_details(ticker):
     """Get detailed REAL-TIME analysis for a specific asset"""
     try:
-        import yfinance as yf
-        
         # Fetch REAL-TIME current price
-        stock = yf.Ticker(ticker.upper())
-        info = stock.info
-        real_time_price = None
-        
-        if info:
-            real_time_price = (
-                info.get('regularMarketPrice') or 
-                info.get('currentPrice') or 
-                info.get('regularMarketPreviousClose') or
-                info.get('previousClose')
-            )
+        real_time_price = live_price(ticker.upper())
         
         # Run complete analysis
-        analysis = analyze_asset(ticker)
+        analysis = cached_analysis(ticker)
         
         if analysis:
             # Update with REAL-TIME price
@@ -195,33 +341,22 @@ def get_chart_data(ticker):
     timeframe = request.args.get('timeframe', '1m')
     
     try:
-        import yfinance as yf
-        
         # Get REAL-TIME price and update chart data
         chart_data = fetch_chart_data(ticker, timeframe)
         
         if chart_data:
             # Fetch the absolute latest price
-            stock = yf.Ticker(ticker.upper())
-            info = stock.info
+            real_time_price = live_price(ticker.upper())
             
-            if info:
-                real_time_price = (
-                    info.get('regularMarketPrice') or 
-                    info.get('currentPrice') or 
-                    info.get('regularMarketPreviousClose') or
-                    info.get('previousClose')
-                )
+            if real_time_price:
+                # Update the current price in chart data
+                chart_data['current_price'] = real_time_price
                 
-                if real_time_price:
-                    # Update the current price in chart data
-                    chart_data['current_price'] = real_time_price
-                    
-                    # Recalculate change and change_percent based on real-time price
-                    if 'data' in chart_data and len(chart_data['data']) > 0:
-                        first_open = chart_data['data'][0]['open']
-                        chart_data['change'] = round(real_time_price - first_open, 2)
-                        chart_data['change_percent'] = round(((real_time_price / first_open) - 1) * 100, 2)
+                # Recalculate change and change_percent based on real-time price
+                if 'data' in chart_data and len(chart_data['data']) > 0:
+                    first_open = chart_data['data'][0]['open']
+                    chart_data['change'] = round(real_time_price - first_open, 2)
+                    chart_data['change_percent'] = round(((real_time_price / first_open) - 1) * 100, 2)
             
             chart_data['last_updated'] = datetime.now().isoformat()
             chart_data['data_source'] = 'yfinance_live'
@@ -236,27 +371,11 @@ def get_chart_data(ticker):
 def get_ticker_data(ticker):
     """Get complete REAL-TIME data for a specific ticker"""
     try:
-        from scorpion_backend import analyze_asset
-        import yfinance as yf
-        
-        # Fetch REAL-TIME current price directly from yfinance
-        stock = yf.Ticker(ticker.upper())
-        
-        # Get the absolute latest price info
-        info = stock.info
-        real_time_price = None
-        
-        if info:
-            # Try multiple fields to get the absolute latest price
-            real_time_price = (
-                info.get('regularMarketPrice') or 
-                info.get('currentPrice') or 
-                info.get('regularMarketPreviousClose') or
-                info.get('previousClose')
-            )
+        # Latest price (reused across requests for _PRICE_TTL seconds)
+        real_time_price = live_price(ticker.upper())
         
         # Run complete analysis
-        data = analyze_asset(ticker.upper())
+        data = cached_analysis(ticker.upper())
         
         if data:
             # Update with the REAL-TIME price if we got one
@@ -281,7 +400,7 @@ def portfolio_api():
     global portfolio_data
     
     if request.method == 'GET':
-        return jsonify(portfolio_data)
+        return jsonify(portfolio_snapshot())
     
     elif request.method == 'POST':
         data = request.json
@@ -295,25 +414,34 @@ def portfolio_api():
             if not all([ticker, shares, price]):
                 return jsonify({'error': 'Missing required fields'}), 400
             
-            if 'positions' not in portfolio_data:
-                portfolio_data['positions'] = []
+            held = portfolio_data['positions'].get(ticker)
+            if held:
+                # Another lot of a held ticker: combine shares at their weighted average cost
+                try:
+                    old_shares, new_shares = float(held['shares']), float(shares)
+                    if new_shares <= 0:
+                        raise ValueError(shares)
+                    total_shares = old_shares + new_shares
+                    cost = old_shares * float(held['price']) + new_shares * float(price)
+                    average_price = cost / total_shares
+                except (TypeError, ValueError, ZeroDivisionError):
+                    return jsonify({'error': 'Invalid shares or price'}), 400
+                held['shares'] = total_shares
+                held['price'] = average_price
+                return jsonify({'success': True, 'message': 'Position updated'})
             
-            portfolio_data['positions'].append({
+            portfolio_data['positions'][ticker] = {
                 'ticker': ticker,
                 'shares': shares,
                 'price': price,
                 'added_at': datetime.now().isoformat()
-            })
+            }
             
             return jsonify({'success': True, 'message': 'Position added'})
         
         elif action == 'remove_position':
             ticker = data.get('ticker')
-            if 'positions' in portfolio_data:
-                portfolio_data['positions'] = [
-                    p for p in portfolio_data['positions'] 
-                    if p['ticker'] != ticker
-                ]
+            portfolio_data['positions'].pop(ticker, None)
             
             return jsonify({'success': True, 'message': 'Position removed'})
         
@@ -322,18 +450,17 @@ def portfolio_api():
 @app.route('/api/alerts', methods=['GET', 'POST', 'DELETE'])
 def alerts_api():
     """Alerts management API"""
-    global alerts_data
     
     if request.method == 'GET':
         return jsonify({
             'timestamp': datetime.now().isoformat(),
-            'alerts': alerts_data
+            'alerts': list(alerts_data.values())
         })
     
     elif request.method == 'POST':
         data = request.json
         alert = {
-            'id': len(alerts_data) + 1,
+            'id': next(_alert_ids),
             'ticker': data.get('ticker'),
             'type': data.get('type'),
             'threshold': data.get('threshold'),
@@ -342,12 +469,12 @@ def alerts_api():
             'active': True
         }
         
-        alerts_data.append(alert)
+        alerts_data[alert['id']] = alert
         return jsonify({'success': True, 'alert': alert})
     
     elif request.method == 'DELETE':
         alert_id = request.args.get('id', type=int)
-        alerts_data = [a for a in alerts_data if a['id'] != alert_id]
+        alerts_data.pop(alert_id, None)
         return jsonify({'success': True, 'message': 'Alert deleted'})
 
 @app.route('/api/search')
@@ -357,31 +484,46 @@ def search_assets():
     if not query:
         return jsonify({'assets': []})
     
-    # Search in our universe
-    matching_assets = []
-    for sector, tickers in UNIVERSE.items():
-        for ticker in tickers:
-            if query in ticker.upper():
-                matching_assets.append({
-                    'ticker': ticker,
-                    'sector': sector.replace('_', ' ').title()
-                })
+    # Search in our universe, stopping once 20 matches are found
+    matching_assets = (
+        {'ticker': ticker, 'sector': sector}
+        for upper, ticker, sector in _SEARCH_INDEX if query in upper
+    )
     
     return jsonify({
         'query': query,
-        'assets': matching_assets[:20]  # Limit to 20 results
+        'assets': list(islice(matching_assets, 20))  # Limit to 20 results
     })
 
+# Signal tallies for the last snapshot seen by /api/stats: (snapshot, counts).
+# Snapshots are replaced, never mutated, so identity tells when to recount.
+_signal_counts = (None, None)
+
+def signal_counts(snapshot):
+    """(strong_buys, buys, sells) for a market snapshot, tallied once per snapshot"""
+    global _signal_counts
+    counted, counts = _signal_counts
+    if counted is not snapshot:
+        # Count each recommendation label in one C-level pass, then fold the
+        # handful of distinct labels into the signal buckets
+        label_counts = Counter(map(itemgetter('recommendation'), snapshot['assets']))
+        counts = (
+            label_counts['STRONG BUY'],
+            sum(n for label, n in label_counts.items() if 'BUY' in label),
+            sum(n for label, n in label_counts.items() if 'SELL' in label)
+        )
+        _signal_counts = (snapshot, counts)
+    return counts
+
 @app.route('/api/stats')
 def get_stats():
     """Get platform statistics"""
-    if not market_data:
+    snapshot = market_data
+    if not snapshot:
         return jsonify({'error': 'No data available'}), 404
     
-    assets = market_data['assets']
-    strong_buys = len([a for a in assets if a['recommendation'] == 'STRONG BUY'])
-    buys = len([a for a in assets if 'BUY' in a['recommendation']])
-    sells = len([a for a in assets if 'SELL' in a['recommendation']])
+    assets = snapshot['assets']
+    strong_buys, buys, sells = signal_counts(snapshot)
     
     return jsonify({
         'total_assets': len(assets),
@@ -389,23 +531,22 @@ def get_stats():
         'strong_buys': strong_buys,
         'buys': buys,
         'sells': sells,
-        'active_alerts': len([a for a in alerts_data if a.get('active', True)]),
-        'last_update': market_data['timestamp']
+        'active_alerts': sum(1 for a in alerts_data.values() if a.get('active', True)),
+        'last_update': snapshot['timestamp']
     })
 
 @app.route('/api/refresh')
 def refresh_data():
     """Manually trigger data refresh"""
     try:
-        # Run a quick analysis
-        results = run_live_analysis(sample_size=50)
-        market_data['assets'] = results
-        market_data['timestamp'] = datetime.now().isoformat()
+        # Run a quick analysis, after any refresh already in flight
+        with _refresh_lock:
+            snapshot = update_market_data(sample_size=50)
         
         return jsonify({
             'success': True,
-            'message': f'Refreshed {len(results)} assets',
-            'timestamp': market_data['timestamp']
+            'message': f'Refreshed {snapshot["total_analyzed"]} assets',
+            'timestamp': snapshot['timestamp']
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -424,7 +565,7 @@ def chatbot_api():
         response = chatbot.analyze_user_question(
             question=question,
             market_data=market_data,
-            portfolio_data=portfolio_data
+            portfolio_data=portfolio_snapshot()
         )
         
         return jsonify({
@@ -466,11 +607,7 @@ def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
 if __name__ == '__main__':
-    # Start background tasks (only in local development)
-    # On Vercel/serverless, data is fetched on-demand
-    import os
-    if os.environ.get('VERCEL') != '1':
-        start_background_tasks()
+    # Market data refreshes lazily on the first API request (see refresh_if_stale)
     
     # Run the Flask app
     print("Starting Scorpion Copilot API Server...")
@@ -490,6 +627,7 @@ if __name__ == '__main__':
     print("  POST /api/chatbot - AI investment advice")
     print("  GET  /api/top-opportunities - Top 3 profit opportunities")
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Development server only; production runs under gunicorn (see gunicorn_conf.py)
+    app.run(debug=os.environ.get('FLASK_DEBUG', '1') == '1', host='0.0.0.0', port=5000)
 
 
@@ -0,0 +1,23 @@
+"""
+Gunicorn settings for serving app.py in production:
+
+    pip install gunicorn gevent
+    gunicorn -c gunicorn_conf.py app:app
+
+The gevent worker monkey-patches sockets and threads before loading the app,
+so the blocking Yahoo Finance calls yield to other requests instead of
+holding a worker each.
+"""
+
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+worker_class = 'gevent'
+# A single worker: app.py keeps portfolio, alerts, market data and its caches in
+# module globals, so a second process would answer from its own empty copies
+# (and run its own refreshes). gevent's worker_connections supply the concurrency.
+workers = 1
+worker_connections = 1000
+keepalive = 5
+# Analysis passes can take a while on a cold cache
+timeout = 120
@@ -6,8 +6,13 @@ Pulls real market data and generates AI-powered buy/sell signals
 import yfinance as yf
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import heapq
 import json
+import os
+import tempfile
+from operator import itemgetter
 from typing import Dict, List
 import warnings
 import requests
@@ -15,6 +20,12 @@ from textblob import TextBlob
 import time
 warnings.filterwarnings('ignore')
 
+# orjson is optional; snapshots fall back to the stdlib encoder without it
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Expert portfolios (real holdings from 13F filings)
 EXPERT_PORTFOLIOS = {
     'Warren Buffett': {
@@ -803,8 +814,44 @@ def analyze_asset(ticker: str) -> Dict:
         }
     }
 
-def run_live_analysis(sample_size: int = None):
-    """Run complete analysis on all assets"""
+# Snapshot read by the standalone dashboard and served as a static file
+SIGNALS_FILE = 'live_trading_signals.json'
+
+def save_signals(data: Dict, path: str = SIGNALS_FILE):
+    """Publish data as JSON at path atomically.
+
+    The payload is serialized first, written to a uniquely named temp file in the
+    same directory, then renamed over path: concurrent writers never share a temp
+    file and readers never see a partial snapshot."""
+    if orjson is not None:
+        payload = orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    else:
+        payload = json.dumps(data).encode()
+
+    tmp = tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp', delete=False)
+    try:
+        with tmp:
+            tmp.write(payload)
+        os.chmod(tmp.name, 0o644)  # temp files are created owner-only
+        os.replace(tmp.name, path)
+    except OSError:
+        os.unlink(tmp.name)
+        raise
+
+# Assets analysed at once; each analysis is a few blocking Yahoo round-trips
+ANALYSIS_WORKERS = 16
+
+def _analyze_or_report(ticker: str) -> Dict:
+    """analyze_asset() for the worker pool, logging failures instead of raising"""
+    try:
+        return analyze_asset(ticker)
+    except Exception as e:
+        print(f"\nError analyzing {ticker}: {e}")
+        return None
+
+def run_live_analysis(sample_size: int = None, save: bool = True):
+    """Run complete analysis on all assets; save=False leaves writing
+    SIGNALS_FILE to the caller"""
     print("="*80)
     print("LIVE TRADING INTELLIGENCE SYSTEM - ENHANCED")
     print("="*80)
@@ -821,16 +868,12 @@ def run_live_analysis(sample_size: int = None):
     else:
         test_tickers = ALL_TICKERS
 
-    for i, ticker in enumerate(test_tickers):
-        print(f"Progress: {i+1}/{len(test_tickers)} - {ticker}                    ", end='\r')
-
-        try:
-            analysis = analyze_asset(ticker)
+    with ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS) as executor:
+        analyses = executor.map(_analyze_or_report, test_tickers)
+        for i, (ticker, analysis) in enumerate(zip(test_tickers, analyses)):
+            print(f"Progress: {i+1}/{len(test_tickers)} - {ticker}                    ", end='\r')
             if analysis:
                 results.append(analysis)
-        except Exception as e:
-            print(f"\nError analyzing {ticker}: {e}")
-            continue
 
     # Sort by score
     results.sort(key=lambda x: x['score'], reverse=True)
@@ -849,25 +892,25 @@ def run_live_analysis(sample_size: int = None):
         for reason in asset['reasoning'][:3]:
             print(f"      {reason}")
 
-    # Save to JSON
-    output = {
-        'timestamp': datetime.now().isoformat(),
-        'total_analyzed': len(results),
-        'total_universe': len(ALL_TICKERS),
-        'assets': results
-    }
-
-    with open('live_trading_signals.json', 'w') as f:
-        json.dump(output, f, indent=2)
-
     print("\n\nAnalysis complete!")
     print(f"{len(results)} assets analyzed with live data")
-    print(f"Results saved to 'live_trading_signals.json'")
+
+    if save:
+        save_signals({
+            'timestamp': datetime.now().isoformat(),
+            'total_analyzed': len(results),
+            'total_universe': len(ALL_TICKERS),
+            'assets': results
+        })
+        print(f"Results saved to '{SIGNALS_FILE}'")
 
     # Statistics
-    strong_buys = len([a for a in results if a['recommendation'] == 'STRONG BUY'])
-    buys = len([a for a in results if a['recommendation'] in ['BUY', 'MODERATE BUY']])
-    sells = len([a for a in results if 'SELL' in a['recommendation']])
+    strong_buys = buys = sells = 0
+    for asset in results:
+        recommendation = asset['recommendation']
+        strong_buys += recommendation == 'STRONG BUY'
+        buys += recommendation in ('BUY', 'MODERATE BUY')
+        sells += 'SELL' in recommendation
 
     print(f"\nSignals: {strong_buys} Strong Buy | {buys} Buy | {sells} Sell")
 
@@ -923,9 +966,8 @@ def get_news_feed() -> List[Dict]:
             'tickers': []
         }]
     
-    # Sort by timestamp (newest first) and limit to 20 items
-    news_items.sort(key=lambda x: x['timestamp'], reverse=True)
-    return news_items[:20]
+    # Newest 20 by timestamp
+    return heapq.nlargest(20, news_items, key=itemgetter('timestamp'))
 
 if __name__ == "__main__":
     print("Make sure you have installed: pip install yfinance pandas numpy textblob requests\n")
@@ -3,6 +3,7 @@ Top 3 Profit Opportunities Engine
 Analyzes 1000+ assets and identifies the top 3 highest probability profit opportunities
 """
 
+import heapq
 import json
 import random
 import numpy as np
@@ -46,9 +47,8 @@ class TopOpportunitiesEngine:
             if opportunity and self._meets_criteria(opportunity):
                 opportunities.append(opportunity)
         
-        # Sort by profit score and return top 3
-        opportunities.sort(key=lambda x: x['profit_score'], reverse=True)
-        top_3 = opportunities[:3]
+        # Keep the top 3 by profit score
+        top_3 = heapq.nlargest(3, opportunities, key=lambda x: x['profit_score'])
         
         # Enhance with additional analysis
         for opp in top_3:
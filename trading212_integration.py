@@ -3,6 +3,7 @@ Trading212 Portfolio Integration
 Handles importing portfolio data from Trading212 CSV exports
 """
 
+import heapq
 import pandas as pd
 import json
 import os
@@ -182,13 +183,7 @@ class Trading212Integration:
         if not self.portfolio_data:
             return []
         
-        positions = sorted(
-            self.portfolio_data['positions'], 
-            key=lambda x: x['value'], 
-            reverse=True
-        )
-        
-        return positions[:limit]
+        return heapq.nlargest(limit, self.portfolio_data['positions'], key=lambda x: x['value'])
 
 def create_trading212_import_page():
     """Create HTML page for Trading212 import"""